@@ -1,9 +1,17 @@
-import os, time, json, random, signal, sys, datetime
+import os, time, signal, sys
+import numpy as np
+import orjson
 import paho.mqtt.client as mqtt
 
 MQTT_HOST = os.getenv('MQTT_HOST','mosquitto')
 MQTT_PORT = int(os.getenv('MQTT_PORT','1883'))
 TOPIC = 'paku/devkit-1/sens/ruuvi'
+# Number of virtual tags; each one publishes once every INTERVAL_S.
+# Raise SIM_DEVICES for load testing (1000 tags is 200 msg/s).
+DEVICES = int(os.getenv('SIM_DEVICES','1'))
+if DEVICES < 1:
+    sys.exit(f"SIM_DEVICES must be at least 1, got {DEVICES}")
+INTERVAL_S = 5.0
 
 run = True
 def _stop(*_): 
@@ -16,19 +24,41 @@ client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
 client.connect(MQTT_HOST, MQTT_PORT, 60)
 client.loop_start()
 
+rng = np.random.default_rng()
+tags = [f"faux-ruuvi-{i + 1}" for i in range(DEVICES)]
+pause = INTERVAL_S / DEVICES
+
+_ts_sec = None
+_ts_str = ""
+def utc_timestamp():
+    """Second-resolution ISO-8601 UTC string, rebuilt at most once a second."""
+    global _ts_sec, _ts_str
+    sec = int(time.time())
+    if sec != _ts_sec:
+        _ts_sec = sec
+        _ts_str = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(sec))
+    return _ts_str
+
 while run:
-    now = datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
-    msg = {
-        "tag":"faux-ruuvi-1",
-        "ts": now,
-        "temperature": round(random.uniform(20.0, 25.0), 2),
-        "humidity": round(random.uniform(45.0, 55.0), 1),
-        "battery": round(random.uniform(3.0, 3.2), 2),
-        "rssi": random.randint(-80, -60)
-    }
-    client.publish(TOPIC, json.dumps(msg), qos=0, retain=False)
-    print("published:", msg, flush=True)
-    time.sleep(5)
+    # One vectorised draw per interval instead of four random calls per message
+    temperature = rng.uniform(20.0, 25.0, DEVICES).round(2).tolist()
+    humidity = rng.uniform(45.0, 55.0, DEVICES).round(1).tolist()
+    battery = rng.uniform(3.0, 3.2, DEVICES).round(2).tolist()
+    rssi = rng.integers(-80, -60, DEVICES, endpoint=True).tolist()
+    for tag, t, h, b, r in zip(tags, temperature, humidity, battery, rssi):
+        if not run:
+            break
+        msg = {
+            "tag": tag,
+            "ts": utc_timestamp(),
+            "temperature": t,
+            "humidity": h,
+            "battery": b,
+            "rssi": r
+        }
+        client.publish(TOPIC, orjson.dumps(msg), qos=0, retain=False)
+        time.sleep(pause)
+    print(f"published {DEVICES} messages", flush=True)
 
 client.loop_stop()
 client.disconnect()
@@ -6,6 +6,15 @@ into the Postgres `measurements` table using the new hierarchical schema.
 
 Supports topic pattern: {site_id}/{system}/{device_id}/data
 
+The MQTT callback only parses and validates messages, then hands them to a
+bounded queue drained by a DB writer thread (DB_WRITERS of them, each owning
+the devices whose device_id hashes to it). A writer batches up to
+FLUSH_MAX_ROWS events (or FLUSH_INTERVAL_S seconds): measurements go out as
+one `COPY measurements ... FROM STDIN`, edge status/config and OTA writes
+are sent together in libpq pipeline mode. Connections come from a
+psycopg_pool ConnectionPool, which replaces broken connections in the
+background after a Postgres restart.
+
 Environment variables (set via docker compose):
 
     MQTT_HOST
@@ -17,30 +26,134 @@ Environment variables (set via docker compose):
     PGUSER
     PGPASSWORD
     PGDATABASE
+
+    DB_WRITERS (default: 2) - number of DB writer threads
+    LOG_LEVEL (default: INFO) - DEBUG also logs every received message
 """
 
-import json
+import functools
 import logging
 import os
+import queue
 import re
+import signal
 import sys
-from typing import Any, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import orjson
 import paho.mqtt.client as mqtt
 from paho.mqtt.client import CallbackAPIVersion
 import psycopg
+from psycopg.adapt import Dumper
+from psycopg.pq import Format
+from psycopg.types.json import Jsonb, JsonbBinaryDumper, JsonbDumper, set_json_dumps
+from psycopg_pool import ConnectionPool, PoolTimeout
 
 
 # ---------------------------------------------------------------------
 # Logging setup
 # ---------------------------------------------------------------------
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
     stream=sys.stdout,
 )
 logger = logging.getLogger("paku-collector")
 
+# Serialize every Jsonb parameter with orjson (returns UTF-8 bytes directly)
+set_json_dumps(orjson.dumps)
+
+
+class RawJsonb:
+    """Already-encoded JSON bytes to bind verbatim as a jsonb parameter.
+
+    Only wrap bytes that have been parsed successfully (on_message does),
+    so Postgres parses the original MQTT payload once and Python never
+    re-serializes it.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+
+class RawJsonbDumper(Dumper):
+    oid = psycopg.adapters.types["jsonb"].oid
+
+    def dump(self, obj: RawJsonb) -> bytes:
+        return obj.data
+
+
+class RawJsonbBinaryDumper(RawJsonbDumper):
+    format = Format.BINARY
+
+    def dump(self, obj: RawJsonb) -> bytes:
+        # jsonb binary wire format: version byte followed by the JSON text
+        return b"\x01" + obj.data
+
+
+psycopg.adapters.register_dumper(RawJsonb, RawJsonbDumper)
+psycopg.adapters.register_dumper(RawJsonb, RawJsonbBinaryDumper)
+# Registering a dumper also makes it the default for its OID; point jsonb
+# back at psycopg's own dumpers, which binary COPY (set_types) looks up.
+psycopg.adapters.register_dumper(Jsonb, JsonbDumper)
+psycopg.adapters.register_dumper(Jsonb, JsonbBinaryDumper)
+
+# DB writer batching: write when this many events are queued, or after
+# this many seconds, whichever comes first. Events beyond QUEUE_MAX_SIZE
+# are dropped rather than stalling the MQTT network thread.
+FLUSH_MAX_ROWS = 1000
+FLUSH_INTERVAL_S = 0.5
+QUEUE_MAX_SIZE = 10_000
+
+# Connection pool sizing: at most one connection per writer thread. A
+# batch that cannot get a connection within DB_CONNECT_TIMEOUT_S is
+# dropped instead of stalling its writer.
+DB_POOL_MIN_SIZE = 1
+DB_CONNECT_TIMEOUT_S = 5.0
+
+# While Postgres is unreachable a writer keeps its current batch and
+# retries with exponential backoff, giving up after DB_RETRY_TIMEOUT_S.
+DB_RETRY_MIN_DELAY_S = 1.0
+DB_RETRY_MAX_DELAY_S = 30.0
+DB_RETRY_TIMEOUT_S = 120.0
+
+# Largest MQTT payload worth parsing; real messages are a few hundred bytes
+MAX_PAYLOAD_BYTES = 64 * 1024
+
+# Known (device_model, firmware_version) per edge device, recorded once
+# the devices upsert has committed. Status messages that match skip the
+# upsert and only bump last_seen; entries are re-verified with a full
+# upsert after this long, and the least recently seen devices are evicted
+# beyond DEVICE_CACHE_MAX_SIZE.
+DEVICE_CACHE_TTL_S = 300.0
+DEVICE_CACHE_MAX_SIZE = 4096
+
+# Per-message successes are counted, not logged; totals are logged this often
+STATS_INTERVAL_S = 10.0
+
+MEASUREMENT_COLUMNS = "site_id, system, device_id, location, mac, ts, metrics"
+# Postgres types of MEASUREMENT_COLUMNS, for binary COPY
+MEASUREMENT_TYPES = ["text", "text", "text", "text", "text", "timestamptz", "jsonb"]
+
+# (site_id, system, device_id, location, mac, ts, metrics)
+MeasurementRow = Tuple[str, str, str, Optional[str], Optional[str], datetime, Jsonb]
+
+# A queued DB write: writer(cur, *args)
+PendingWrite = Tuple[Callable[..., None], Tuple[Any, ...]]
+
+_REQUIRED_FIELDS = ("device_id", "metrics")
+
+# {site_id}/{system}/{device_id}/{data|status|config}
+_TOPIC_RE = re.compile(r"([^/]+)/([^/]+)/([^/]+)/(data|status|config)")
+# {site_id}/edge/{device_id}/ota/{status|progress|result}
+_OTA_TOPIC_RE = re.compile(r"([^/]+)/(edge)/([^/]+)/ota/(status|progress|result)")
+
 
 # ---------------------------------------------------------------------
 # Configuration helpers
@@ -70,40 +183,57 @@ def load_config() -> Dict[str, Any]:
         "pg_user": get_env("PGUSER"),
         "pg_password": get_env("PGPASSWORD"),
         "pg_database": get_env("PGDATABASE"),
+        "db_writers": int(os.getenv("DB_WRITERS", "2")),
     }
 
 
 # ---------------------------------------------------------------------
 # Database handling
 # ---------------------------------------------------------------------
-def connect_to_database(cfg: Dict[str, Any]) -> psycopg.Connection:
+def configure_connection(conn: psycopg.Connection) -> None:
+    # The collector runs the same handful of statements forever: prepare
+    # them server-side on first use so later calls only Bind/Execute.
+    conn.prepare_threshold = 0
+
+
+def create_pool(cfg: Dict[str, Any]) -> ConnectionPool:
+    """Create (but do not open) the pool of autocommit connections."""
     logger.info(
         "Connecting to Postgres at %s:%s db=%s",
         cfg["pg_host"],
         cfg["pg_port"],
         cfg["pg_database"],
     )
-    conn = psycopg.connect(
-        host=cfg["pg_host"],
-        port=cfg["pg_port"],
-        user=cfg["pg_user"],
-        password=cfg["pg_password"],
-        dbname=cfg["pg_database"],
-        autocommit=True,
+    return ConnectionPool(
+        kwargs={
+            "host": cfg["pg_host"],
+            "port": cfg["pg_port"],
+            "user": cfg["pg_user"],
+            "password": cfg["pg_password"],
+            "dbname": cfg["pg_database"],
+            "autocommit": True,
+        },
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=max(cfg["db_writers"], DB_POOL_MIN_SIZE),
+        timeout=DB_CONNECT_TIMEOUT_S,
+        configure=configure_connection,
+        # Cheap liveness check on checkout, so a connection killed by a
+        # Postgres restart is replaced instead of failing the next batch
+        check=ConnectionPool.check_connection,
+        name="paku-collector",
+        open=False,
     )
-    return conn
 
 
-def insert_measurement(
-    conn: psycopg.Connection,
+def measurement_row(
     site_id: str,
     system: str,
     device_id: str,
     payload: Dict[str, Any]
-) -> None:
+) -> MeasurementRow:
     """
-    Insert one measurement row into the database using new schema.
-    
+    Build one `measurements` row, in MEASUREMENT_COLUMNS order.
+
     Expected payload structure:
     {
         "timestamp": "2025-12-01T20:00:00Z",
@@ -116,49 +246,110 @@ def insert_measurement(
             ...
         }
     }
+
+    The ingestion time is used when the device sends no timestamp, so rows
+    keep their arrival time even if they sit in the buffer for a while.
+
+    Values are converted to the exact Python types binary COPY expects;
+    raises ValueError (or TypeError) for an unparseable timestamp.
     """
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO measurements (
-                site_id,
-                system,
-                device_id,
-                location,
-                mac,
-                ts,
-                metrics
-            )
-            VALUES (
-                %(site_id)s,
-                %(system)s,
-                %(device_id)s,
-                %(location)s,
-                %(mac)s,
-                COALESCE(%(timestamp)s::timestamptz, NOW()),
-                %(metrics)s::jsonb
-            )
-            """,
-            {
-                "site_id": site_id,
-                "system": system,
-                "device_id": device_id,
-                "location": payload.get("location"),
-                "mac": payload.get("mac"),
-                "timestamp": payload.get("timestamp"),
-                "metrics": json.dumps(payload.get("metrics", {})),
-            },
-        )
+    ts = payload.get("timestamp")
+    return (
+        site_id,
+        system,
+        device_id,
+        _opt_str(payload.get("location")),
+        _opt_str(payload.get("mac")),
+        parse_timestamp(ts) if ts else datetime.now(timezone.utc),
+        Jsonb(payload.get("metrics", {})),
+    )
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse an ISO 8601 device timestamp; naive values are taken as UTC."""
+    ts = datetime.fromisoformat(value)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts
+
+
+def _opt_str(value: Any) -> Optional[str]:
+    return value if value is None or type(value) is str else str(value)
+
+
+INSERT_MEASUREMENT_SQL = f"""
+    INSERT INTO measurements ({MEASUREMENT_COLUMNS})
+    VALUES (%s, %s, %s, %s, %s, %s::timestamptz, %b)
+"""
+
+COPY_MEASUREMENTS_SQL = f"COPY measurements ({MEASUREMENT_COLUMNS}) FROM STDIN (FORMAT BINARY)"
+
+
+def insert_measurement(cur: psycopg.Cursor, row: MeasurementRow) -> None:
+    """Insert a single measurement row (slow path, used when COPY fails)."""
+    cur.execute(INSERT_MEASUREMENT_SQL, row)
+
+
+def copy_measurements(cur: psycopg.Cursor, rows: List[MeasurementRow]) -> None:
+    """Write a batch of measurement rows with a single binary COPY FROM STDIN.
+
+    The COPY commits without waiting for the WAL flush: a Postgres crash
+    can lose the last few hundred ms of telemetry, never corrupt it. Edge
+    and OTA writes keep the default synchronous commit.
+    """
+    with cur.connection.transaction():
+        cur.execute("SET LOCAL synchronous_commit = off")
+        with cur.copy(COPY_MEASUREMENTS_SQL) as copy:
+            copy.set_types(MEASUREMENT_TYPES)
+            for row in rows:
+                copy.write_row(row)
+
+
+# Parameters: (site_id, device_id, status, timestamp)
+INSERT_EDGE_STATUS_SQL = """
+    INSERT INTO edge_device_status (site_id, device_id, status, ts)
+    VALUES (%s, %s, %b, COALESCE(%s::timestamptz, NOW()))
+"""
+
+# Register or update the device in the OTA devices table in the same
+# statement as the status insert (one round-trip instead of two).
+# Parameters: (device_id, device_model, firmware_version) + status parameters
+INSERT_EDGE_STATUS_REGISTER_SQL = """
+    WITH upd AS (
+        INSERT INTO devices (device_id, device_model, current_firmware_version, last_seen)
+        VALUES (%s, %s, %s, NOW())
+        ON CONFLICT (device_id)
+        DO UPDATE SET
+            device_model = EXCLUDED.device_model,
+            current_firmware_version = EXCLUDED.current_firmware_version,
+            last_seen = NOW()
+    )
+""" + INSERT_EDGE_STATUS_SQL
+
+# Device already registered with this model/firmware: only bump last_seen.
+# Parameters: (device_id,) + status parameters
+INSERT_EDGE_STATUS_SEEN_SQL = """
+    WITH upd AS (
+        UPDATE devices SET last_seen = NOW() WHERE device_id = %s
+    )
+""" + INSERT_EDGE_STATUS_SQL
 
 
 def insert_edge_status(
-    conn: psycopg.Connection,
+    cur: psycopg.Cursor,
     site_id: str,
     device_id: str,
-    payload: Dict[str, Any]
+    payload: Dict[str, Any],
+    raw_payload: bytes,
+    registered: bool = False,
 ) -> None:
     """
     Insert edge device status into the database.
+
+    `payload` is the parsed message (used for the device registry columns),
+    `raw_payload` the original MQTT bytes stored as the status document.
+    `registered` means the devices row is known to match the payload's
+    model and firmware, so only its last_seen is updated.
     
     Expected payload structure:
     {
@@ -173,64 +364,40 @@ def insert_edge_status(
         ...
     }
     """
-    with conn.cursor() as cur:
-        # Register or update device in OTA devices table if device info is present
-        device_model = payload.get("device_model")
-        firmware_version = payload.get("firmware_version")
-        
-        if device_model:
-            cur.execute(
-                """
-                INSERT INTO devices (device_id, device_model, current_firmware_version, last_seen)
-                VALUES (%(device_id)s, %(device_model)s, %(firmware_version)s, NOW())
-                ON CONFLICT (device_id) 
-                DO UPDATE SET 
-                    device_model = EXCLUDED.device_model,
-                    current_firmware_version = EXCLUDED.current_firmware_version,
-                    last_seen = NOW()
-                """,
-                {
-                    "device_id": device_id,
-                    "device_model": device_model,
-                    "firmware_version": firmware_version,
-                },
-            )
-        
-        # Insert status record
+    status_params = (site_id, device_id, RawJsonb(raw_payload), payload.get("timestamp"))
+    device_model = payload.get("device_model")
+
+    if not device_model:
+        cur.execute(INSERT_EDGE_STATUS_SQL, status_params)
+    elif registered:
+        cur.execute(INSERT_EDGE_STATUS_SEEN_SQL, (device_id, *status_params))
+    else:
         cur.execute(
-            """
-            INSERT INTO edge_device_status (
-                site_id,
-                device_id,
-                status,
-                ts
-            )
-            VALUES (
-                %(site_id)s,
-                %(device_id)s,
-                %(status)s::jsonb,
-                COALESCE(%(timestamp)s::timestamptz, NOW())
-            )
-            """,
-            {
-                "site_id": site_id,
-                "device_id": device_id,
-                "status": json.dumps(payload),
-                "timestamp": payload.get("timestamp"),
-            },
+            INSERT_EDGE_STATUS_REGISTER_SQL,
+            (device_id, device_model, payload.get("firmware_version"), *status_params),
         )
 
 
+UPSERT_EDGE_CONFIG_SQL = """
+    INSERT INTO edge_device_configs (site_id, device_id, config, updated_at)
+    VALUES (%s, %s, %b, NOW())
+    ON CONFLICT (site_id, device_id)
+    DO UPDATE SET
+        config = EXCLUDED.config,
+        updated_at = NOW()
+"""
+
+
 def upsert_edge_config(
-    conn: psycopg.Connection,
+    cur: psycopg.Cursor,
     site_id: str,
     device_id: str,
-    payload: Dict[str, Any]
+    raw_payload: bytes,
 ) -> None:
     """
     Upsert edge device configuration into the database.
-    
-    Expected payload structure:
+
+    The config is stored from the original MQTT bytes. Expected structure:
     {
         "timing": {...},
         "sensors": {...},
@@ -238,39 +405,61 @@ def upsert_edge_config(
         ...
     }
     """
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO edge_device_configs (
-                site_id,
-                device_id,
-                config,
-                updated_at
-            )
-            VALUES (
-                %(site_id)s,
-                %(device_id)s,
-                %(config)s::jsonb,
-                NOW()
-            )
-            ON CONFLICT (site_id, device_id)
-            DO UPDATE SET
-                config = %(config)s::jsonb,
-                updated_at = NOW()
-            """,
-            {
-                "site_id": site_id,
-                "device_id": device_id,
-                "config": json.dumps(payload),
-            },
-        )
+    cur.execute(UPSERT_EDGE_CONFIG_SQL, (site_id, device_id, RawJsonb(raw_payload)))
 
 
 # ---------------------------------------------------------------------
 # OTA message handling
 # ---------------------------------------------------------------------
+# OTA command acknowledged – create initial tracking row.
+# Parameters: (device_id, firmware_version)
+INSERT_OTA_PENDING_SQL = """
+    INSERT INTO device_update_status
+        (device_id, firmware_version, status, started_at, reported_at)
+    VALUES (%s, %s, 'pending', NOW(), NOW())
+"""
+
+# Parameters: (event_type, device_id, firmware_version, event_data)
+INSERT_OTA_EVENT_SQL = """
+    INSERT INTO ota_events
+        (event_type, device_id, firmware_version, event_data)
+    VALUES (%s, %s, %s, %b)
+"""
+
+# Progress and result update the device's latest tracking row.
+# Parameters: (status, percent, device_id)
+UPDATE_OTA_PROGRESS_SQL = """
+    UPDATE device_update_status
+    SET status = %s,
+        progress_percent = %s,
+        reported_at = NOW()
+    WHERE id = (
+        SELECT id FROM device_update_status
+        WHERE device_id = %s
+        ORDER BY reported_at DESC
+        LIMIT 1
+    )
+"""
+
+# Parameters: (status, success, error_message, device_id)
+UPDATE_OTA_RESULT_SQL = """
+    UPDATE device_update_status
+    SET status = %s,
+        progress_percent = CASE WHEN %s THEN 100 ELSE progress_percent END,
+        error_message = %s,
+        completed_at = NOW(),
+        reported_at = NOW()
+    WHERE id = (
+        SELECT id FROM device_update_status
+        WHERE device_id = %s
+        ORDER BY reported_at DESC
+        LIMIT 1
+    )
+"""
+
+
 def handle_ota_message(
-    conn: psycopg.Connection,
+    cur: psycopg.Cursor,
     device_id: str,
     ota_type: str,
     payload: Dict[str, Any],
@@ -283,101 +472,35 @@ def handle_ota_message(
     """
     firmware_version = payload.get("target_version", payload.get("version", "unknown"))
 
-    with conn.cursor() as cur:
-        if ota_type == "status":
-            # OTA command acknowledged – create initial tracking row
-            cur.execute(
-                """
-                INSERT INTO device_update_status
-                    (device_id, firmware_version, status, started_at, reported_at)
-                VALUES (%(device_id)s, %(fw)s, 'pending', NOW(), NOW())
-                """,
-                {"device_id": device_id, "fw": firmware_version},
-            )
-            cur.execute(
-                """
-                INSERT INTO ota_events
-                    (event_type, device_id, firmware_version, event_data)
-                VALUES ('update_started', %(device_id)s, %(fw)s, %(data)s::jsonb)
-                """,
-                {
-                    "device_id": device_id,
-                    "fw": firmware_version,
-                    "data": json.dumps(payload),
-                },
-            )
+    if ota_type == "status":
+        cur.execute(INSERT_OTA_PENDING_SQL, (device_id, firmware_version))
+        cur.execute(
+            INSERT_OTA_EVENT_SQL,
+            ("update_started", device_id, firmware_version, Jsonb(payload)),
+        )
 
-        elif ota_type == "progress":
-            # Update the latest tracking row with progress
-            status = "downloading"
-            state = payload.get("state", "").lower()
-            if state == "installing":
-                status = "installing"
-            elif state == "verifying":
-                status = "downloaded"
-
-            cur.execute(
-                """
-                UPDATE device_update_status
-                SET status = %(status)s,
-                    progress_percent = %(pct)s,
-                    reported_at = NOW()
-                WHERE id = (
-                    SELECT id FROM device_update_status
-                    WHERE device_id = %(device_id)s
-                    ORDER BY reported_at DESC
-                    LIMIT 1
-                )
-                """,
-                {
-                    "device_id": device_id,
-                    "status": status,
-                    "pct": payload.get("percent", 0),
-                },
-            )
+    elif ota_type == "progress":
+        status = "downloading"
+        state = str(payload.get("state") or "").lower()
+        if state == "installing":
+            status = "installing"
+        elif state == "verifying":
+            status = "downloaded"
 
-        elif ota_type == "result":
-            success = payload.get("success", False)
-            final_status = "success" if success else "failed"
-            error_msg = None if success else payload.get("message")
-
-            cur.execute(
-                """
-                UPDATE device_update_status
-                SET status = %(status)s,
-                    progress_percent = CASE WHEN %(success)s THEN 100 ELSE progress_percent END,
-                    error_message = %(err)s,
-                    completed_at = NOW(),
-                    reported_at = NOW()
-                WHERE id = (
-                    SELECT id FROM device_update_status
-                    WHERE device_id = %(device_id)s
-                    ORDER BY reported_at DESC
-                    LIMIT 1
-                )
-                """,
-                {
-                    "device_id": device_id,
-                    "status": final_status,
-                    "success": success,
-                    "err": error_msg,
-                },
-            )
+        cur.execute(UPDATE_OTA_PROGRESS_SQL, (status, payload.get("percent", 0), device_id))
 
-            event_type = "update_completed" if success else "update_failed"
-            cur.execute(
-                """
-                INSERT INTO ota_events
-                    (event_type, device_id, firmware_version, event_data)
-                VALUES (%(evt)s, %(device_id)s, %(fw)s, %(data)s::jsonb)
-                """,
-                {
-                    "evt": event_type,
-                    "device_id": device_id,
-                    "fw": firmware_version,
-                    "data": json.dumps(payload),
-                },
-            )
+    elif ota_type == "result":
+        success = payload.get("success", False)
+        final_status = "success" if success else "failed"
+        error_msg = None if success else payload.get("message")
+
+        cur.execute(UPDATE_OTA_RESULT_SQL, (final_status, success, error_msg, device_id))
+
+        event_type = "update_completed" if success else "update_failed"
+        cur.execute(
+            INSERT_OTA_EVENT_SQL,
+            (event_type, device_id, firmware_version, Jsonb(payload)),
+        )
 
 
 # ---------------------------------------------------------------------
@@ -390,24 +513,28 @@ def validate_payload(data: Dict[str, Any]) -> bool:
     Required: device_id, metrics
     Optional: timestamp, location
     """
-    required_fields = ["device_id", "metrics"]
-    missing = [f for f in required_fields if f not in data]
-    
-    if missing:
+    # Plain lookups on the happy path; the missing-field list is only
+    # built when a message is actually rejected.
+    metrics = data.get("metrics")
+    if data.get("device_id") is None or metrics is None:
+        missing = [f for f in _REQUIRED_FIELDS if data.get(f) is None]
         logger.warning("Payload missing required fields %s: %s", missing, data)
         return False
     
-    if not isinstance(data["metrics"], dict):
-        logger.warning("metrics field must be a dict, got: %s", type(data["metrics"]))
+    if type(metrics) is not dict:
+        logger.warning("metrics field must be a dict, got: %s", type(metrics))
         return False
     
-    if not data["metrics"]:
+    if not metrics:
         logger.warning("metrics field is empty: %s", data)
         return False
     
     return True
 
 
+# Devices publish on the same few topics over and over, so nearly every
+# call is a cache hit; the bound keeps junk topics from growing it.
+@functools.lru_cache(maxsize=4096)
 def parse_topic(topic: str) -> Optional[tuple[str, str, str, str]]:
     """
     Parse topic structure:
@@ -422,29 +549,218 @@ def parse_topic(topic: str) -> Optional[tuple[str, str, str, str]]:
     - config: edge device configuration
     - ota_status, ota_progress, ota_result: OTA update messages
     """
-    parts = topic.split("/")
-
-    # 5-segment OTA topics: {site_id}/edge/{device_id}/ota/{ota_type}
-    if len(parts) == 5 and parts[1] == "edge" and parts[3] == "ota":
-        site_id, system, device_id, _, ota_type = parts
-        if ota_type in ["status", "progress", "result"]:
-            return (site_id, system, device_id, f"ota_{ota_type}")
-        logger.debug("Ignoring unknown OTA sub-topic '%s': %s", ota_type, topic)
-        return None
-
-    # 4-segment standard topics
-    if len(parts) != 4:
-        logger.warning("Invalid topic structure (expected 4 or 5 levels): %s", topic)
-        return None
-    
-    site_id, system, device_id, topic_type = parts
-    
-    # Support data, status, and config topics
-    if topic_type not in ["data", "status", "config"]:
-        logger.debug("Ignoring unsupported topic type '%s': %s", topic_type, topic)
-        return None
-    
-    return (site_id, system, device_id, topic_type)
+    # One C-level regex match per pattern instead of split + list scans
+    m = _TOPIC_RE.fullmatch(topic)
+    if m:
+        return m.groups()
+
+    m = _OTA_TOPIC_RE.fullmatch(topic)
+    if m:
+        site_id, system, device_id, ota_type = m.groups()
+        return (site_id, system, device_id, "ota_" + ota_type)
+
+    return None
+
+
+# ---------------------------------------------------------------------
+# Batched DB writer
+# ---------------------------------------------------------------------
+class BatchWriter:
+    """
+    Queue of pending writes drained by a dedicated thread.
+
+    Producers (the MQTT network thread) only enqueue; the writer thread
+    groups up to FLUSH_MAX_ROWS queued writes (or whatever arrived within
+    FLUSH_INTERVAL_S), sends measurement rows as one COPY and everything
+    else in one pipeline.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        name: str = "db-writer",
+        on_written: Optional[Callable[..., None]] = None,
+    ) -> None:
+        self.pool = pool
+        # Called with (writer, args) for each edge/OTA write once committed
+        self.on_written = on_written
+        self.q: "queue.Queue[PendingWrite]" = queue.Queue(maxsize=QUEUE_MAX_SIZE)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._closing = threading.Event()
+
+        # Counters reported every STATS_INTERVAL_S by the writer thread.
+        # Each is only ever written by one thread: _queue_full by the
+        # producer (a running total, never reset), the rest by the writer.
+        self._inserted = 0
+        self._written = 0
+        self._dropped = 0
+        self._queue_full = 0
+        self._queue_full_seen = 0
+        self._last_stats = time.monotonic()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def join(self) -> None:
+        """Block until every write queued so far has been flushed."""
+        self.q.join()
+
+    def close(self) -> None:
+        """Stop waiting out DB outages: remaining batches get one attempt."""
+        self._closing.set()
+
+    def enqueue(self, writer: Callable[..., None], *args: Any) -> None:
+        """Queue writer(cur, *args); never blocks, drops when the queue is full."""
+        try:
+            self.q.put_nowait((writer, args))
+        except queue.Full:
+            self._queue_full += 1
+
+    def _run(self) -> None:
+        """Drain the queue in batches of up to FLUSH_MAX_ROWS / FLUSH_INTERVAL_S."""
+        while True:
+            try:
+                batch = [self.q.get(timeout=STATS_INTERVAL_S)]
+            except queue.Empty:
+                self._log_stats()
+                continue
+            deadline = time.monotonic() + FLUSH_INTERVAL_S
+            while len(batch) < FLUSH_MAX_ROWS:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.q.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self.write_batch(batch)
+            except Exception as exc:
+                logger.exception("Failed to write batch of %d: %s", len(batch), exc)
+            finally:
+                for _ in batch:
+                    self.q.task_done()
+            self._log_stats()
+
+    def _log_stats(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_stats
+        if elapsed < STATS_INTERVAL_S:
+            return
+        queue_full = self._queue_full
+        self._dropped += queue_full - self._queue_full_seen
+        self._queue_full_seen = queue_full
+        if self._inserted or self._written or self._dropped:
+            logger.info(
+                "%s: wrote %d measurements and %d edge/OTA writes in the last %.0fs (dropped %d, queued %d)",
+                self._thread.name,
+                self._inserted,
+                self._written,
+                elapsed,
+                self._dropped,
+                self.q.qsize(),
+            )
+        self._inserted = self._written = self._dropped = 0
+        self._last_stats = now
+
+    def write_batch(self, batch: List[PendingWrite]) -> None:
+        """Coalesce measurement rows into one COPY; pipeline everything else."""
+        rows = [args[0] for writer, args in batch if writer is insert_measurement]
+        writes = [item for item in batch if item[0] is not insert_measurement]
+
+        for flush, items in ((self.flush_measurements, rows), (self.flush_writes, writes)):
+            if items:
+                self._flush_with_retry(flush, items)
+
+    def _flush_with_retry(self, flush: Callable[..., None], items: list) -> None:
+        """
+        Run flush(cur, items), retrying with backoff while Postgres is
+        unreachable. New events keep queueing meanwhile (and are dropped
+        only once the queue is full); the held batch is given up after
+        DB_RETRY_TIMEOUT_S, or right away once the writer is closing.
+
+        On connection loss the flush methods trim `items` down to the
+        writes that were not applied yet, so a retry never repeats them.
+        """
+        delay = DB_RETRY_MIN_DELAY_S
+        deadline = time.monotonic() + DB_RETRY_TIMEOUT_S
+        while True:
+            try:
+                # A connection broken by the flush is discarded by the pool
+                # on return, so the retry gets a fresh one. While closing,
+                # don't wait the full pool timeout for it either.
+                timeout = DB_RETRY_MIN_DELAY_S if self._closing.is_set() else None
+                with self.pool.connection(timeout=timeout) as conn:
+                    flush(conn.cursor(), items)
+                return
+            except (psycopg.OperationalError, PoolTimeout) as exc:
+                if self._closing.is_set() or time.monotonic() + delay > deadline:
+                    logger.error("DB still unavailable, dropping %d queued writes: %s", len(items), exc)
+                    self._dropped += len(items)
+                    return
+                logger.warning("DB unavailable, retrying %d writes in %.0fs: %s", len(items), delay, exc)
+                # Woken early by close() for one last attempt
+                self._closing.wait(delay)
+                delay = min(delay * 2, DB_RETRY_MAX_DELAY_S)
+
+    def flush_writes(self, cur: psycopg.Cursor, writes: List[PendingWrite]) -> None:
+        """Send edge/OTA writes in one pipeline, falling back to one by one."""
+        if psycopg.Pipeline.is_supported():
+            try:
+                # One transaction around the pipeline: on any error, a
+                # rejected statement or an exception in a writer, nothing
+                # is applied and the writes can simply be retried.
+                with cur.connection.pipeline(), cur.connection.transaction():
+                    for writer, args in writes:
+                        writer(cur, *args)
+            except Exception as exc:
+                if cur.connection.broken:
+                    raise
+                logger.warning("Pipelined flush of %d writes failed, retrying one by one: %s", len(writes), exc)
+            else:
+                for writer, args in writes:
+                    self._applied(writer, args)
+                return
+
+        for i, (writer, args) in enumerate(writes):
+            try:
+                writer(cur, *args)
+            except Exception as exc:
+                if cur.connection.broken:
+                    del writes[:i]
+                    raise
+                logger.warning("Rejected %s for %s: %s", writer.__name__, args[:2], exc)
+            else:
+                self._applied(writer, args)
+
+    def _applied(self, writer: Callable[..., None], args: Tuple[Any, ...]) -> None:
+        self._written += 1
+        if self.on_written is not None:
+            self.on_written(writer, args)
+
+    def flush_measurements(self, cur: psycopg.Cursor, rows: List[MeasurementRow]) -> None:
+        """Write measurements with COPY, falling back to per-row INSERTs."""
+        try:
+            copy_measurements(cur, rows)
+            self._inserted += len(rows)
+            return
+        except psycopg.Error as exc:
+            if cur.connection.broken:
+                raise
+            logger.warning("COPY of %d measurements failed, retrying row by row: %s", len(rows), exc)
+
+        inserted = 0
+        for i, row in enumerate(rows):
+            try:
+                insert_measurement(cur, row)
+                self._inserted += 1
+                inserted += 1
+            except psycopg.Error as exc:
+                if cur.connection.broken:
+                    del rows[:i]
+                    raise
+                logger.warning("Rejected measurement %s/%s/%s: %s", row[0], row[1], row[2], exc)
+        logger.info("Inserted %d of %d measurements", inserted, len(rows))
 
 
 # ---------------------------------------------------------------------
@@ -453,29 +769,44 @@ def parse_topic(topic: str) -> Optional[tuple[str, str, str, str]]:
 class CollectorApp:
     def __init__(self, cfg: Dict[str, Any]) -> None:
         self.cfg = cfg
-        self.conn: Optional[psycopg.Connection] = None
+        self.pool = create_pool(cfg)
         self.client = mqtt.Client(callback_api_version=CallbackAPIVersion.VERSION2)
 
+        # Parsed events are handed to the writer threads. on_message runs on
+        # paho's network thread and must never block on Postgres. Each
+        # device always maps to the same writer, so its writes stay in order.
+        self.writers = [
+            BatchWriter(self.pool, name=f"db-writer-{i}", on_written=self._on_written)
+            for i in range(max(cfg["db_writers"], 1))
+        ]
+
+        # device_id -> (device_model, firmware_version, expires), least
+        # recently seen first. Filled by the writer threads after commit,
+        # read by the MQTT network thread.
+        self._device_cache: "OrderedDict[str, Tuple[Any, Any, float]]" = OrderedDict()
+        self._device_cache_lock = threading.Lock()
+
+        # Set by SIGTERM; the main thread only waits on it while paho's
+        # network loop and the writer run in their own threads.
+        self._stop = threading.Event()
+
+        # (system, topic_type) -> handler; "*" matches any system
+        self._dispatch: Dict[Tuple[str, str], Callable[..., None]] = {
+            ("*", "data"): self._handle_data,
+            ("edge", "status"): self._handle_status,
+            ("edge", "config"): self._handle_config,
+            ("edge", "ota_status"): functools.partial(self._handle_ota, "status"),
+            ("edge", "ota_progress"): functools.partial(self._handle_ota, "progress"),
+            ("edge", "ota_result"): functools.partial(self._handle_ota, "result"),
+        }
+
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
         self.client.on_disconnect = self.on_disconnect
 
-    def _ensure_connection(self) -> bool:
-        """Ensure DB connection is alive, reconnect if needed. Returns True if connected."""
-        if self.conn is not None and not self.conn.closed:
-            return True
-        logger.warning("DB connection lost, reconnecting...")
-        try:
-            self.conn = connect_to_database(self.cfg)
-            return True
-        except Exception as exc:
-            logger.error("DB reconnect failed: %s", exc)
-            self.conn = None
-            return False
-
     def start(self) -> None:
-        # Connect to DB once at startup
-        self.conn = connect_to_database(self.cfg)
+        # Fail fast if Postgres is unreachable at startup
+        self.pool.open(wait=True)
 
         # Set MQTT credentials if provided
         mqtt_user = self.cfg.get("mqtt_user")
@@ -490,8 +821,31 @@ class CollectorApp:
             self.cfg["mqtt_port"],
             ", ".join(self.cfg["mqtt_topic_patterns"]),
         )
+        signal.signal(signal.SIGTERM, self._on_sigterm)
+        # Back off reconnects instead of hammering the broker
+        self.client.reconnect_delay_set(min_delay=1, max_delay=30)
         self.client.connect(self.cfg["mqtt_host"], self.cfg["mqtt_port"], keepalive=60)
-        self.client.loop_forever()
+        for writer in self.writers:
+            writer.start()
+        self.client.loop_start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        finally:
+            self.client.disconnect()
+            self.client.loop_stop()
+            # Let the writers finish everything already received, without
+            # sitting out a DB outage past the container's stop timeout
+            logger.info("Draining %d queued writes", sum(w.q.qsize() for w in self.writers))
+            for writer in self.writers:
+                writer.close()
+            for writer in self.writers:
+                writer.join()
+            self.pool.close()
+
+    def _on_sigterm(self, signum, frame) -> None:
+        logger.info("SIGTERM received, shutting down")
+        self._stop.set()
 
     # MQTT callbacks ---------------------------------------------------
     def on_connect(self, client, userdata, flags, reason_code, properties):
@@ -508,84 +862,116 @@ class CollectorApp:
 
     def on_message(self, client, userdata, msg):
         topic = msg.topic
-        payload_raw = msg.payload.decode("utf-8", errors="replace")
-        logger.debug("Received MQTT message on %s: %s", topic, payload_raw)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Received MQTT message on %s: %r", topic, msg.payload)
 
         # Parse topic to extract site_id, system, device_id, topic_type
         parsed = parse_topic(topic)
         if not parsed:
-            logger.debug("Ignoring unsupported topic: %s", topic)
+            if debug:
+                logger.debug("Ignoring unsupported topic: %s", topic)
             return
         
         site_id, system, device_id, topic_type = parsed
 
-        try:
-            data = json.loads(payload_raw)
-        except json.JSONDecodeError:
-            logger.warning("Failed to decode JSON payload on %s: %s", topic, payload_raw)
+        handler = self._dispatch.get((system, topic_type)) or self._dispatch.get(("*", topic_type))
+        if handler is None:
+            if debug:
+                logger.debug("Unhandled topic type: %s (system=%s)", topic_type, system)
             return
 
-        if not isinstance(data, dict):
-            logger.warning("Expected JSON object on %s, got: %r", topic, data)
+        payload = msg.payload
+        if len(payload) > MAX_PAYLOAD_BYTES:
+            logger.warning("Dropping %d byte payload on %s (limit %d)", len(payload), topic, MAX_PAYLOAD_BYTES)
             return
 
-        if not self._ensure_connection():
-            logger.error("No DB connection available; dropping message from %s", topic)
+        # Every handler needs a JSON object; anything else is rejected
+        # without running the parser (leading whitespace is still allowed)
+        if not payload or (payload[0] != 0x7B and not payload.lstrip().startswith(b"{")):
+            logger.warning("Expected JSON object on %s, got: %r", topic, payload[:100])
             return
 
         try:
-            if topic_type == "data":
-                # Handle sensor data measurements
-                if not validate_payload(data):
-                    return
-                
-                insert_measurement(self.conn, site_id, system, device_id, data)
-                logger.info(
-                    "Inserted measurement: %s/%s/%s location=%s",
-                    site_id,
-                    system,
-                    device_id,
-                    data.get("location", "N/A")
-                )
-                
-            elif topic_type == "status" and system == "edge":
-                # Handle edge device status updates
-                insert_edge_status(self.conn, site_id, device_id, data)
-                logger.info(
-                    "Inserted edge status: %s/edge/%s state=%s",
-                    site_id,
-                    device_id,
-                    data.get("state", "N/A")
-                )
-                
-            elif topic_type == "config" and system == "edge":
-                # Handle edge device configuration updates
-                upsert_edge_config(self.conn, site_id, device_id, data)
-                logger.info(
-                    "Updated edge config: %s/edge/%s",
-                    site_id,
-                    device_id
-                )
-
-            elif topic_type.startswith("ota_") and system == "edge":
-                # Handle OTA status/progress/result messages
-                ota_type = topic_type[4:]  # strip "ota_" prefix
-                handle_ota_message(self.conn, device_id, ota_type, data)
-                logger.info(
-                    "OTA %s from %s/edge/%s",
-                    ota_type,
-                    site_id,
-                    device_id,
-                )
-            else:
-                logger.debug("Unhandled topic type: %s (system=%s)", topic_type, system)
+            # orjson parses (and UTF-8 validates) the raw bytes directly
+            data = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            logger.warning(
+                "Failed to decode JSON payload on %s: %s",
+                topic,
+                payload.decode("utf-8", errors="replace"),
+            )
+            return
 
-        except psycopg.OperationalError as exc:
-            logger.warning("DB connection lost while processing %s, will reconnect on next message: %s", topic, exc)
-            self.conn = None
+        try:
+            handler(site_id, system, device_id, data, payload)
         except Exception as exc:
             logger.exception("Failed to process message from %s: %s", topic, exc)
 
+    def _writer_for(self, device_id: str) -> BatchWriter:
+        return self.writers[hash(device_id) % len(self.writers)]
+
+    # Topic handlers ---------------------------------------------------
+    # Each takes (site_id, system, device_id, data, raw_payload).
+    def _handle_data(self, site_id, system, device_id, data, raw_payload) -> None:
+        if not validate_payload(data):
+            return
+        try:
+            row = measurement_row(site_id, system, device_id, data)
+        except (TypeError, ValueError):
+            logger.warning("Invalid timestamp from %s/%s/%s: %r", site_id, system, device_id, data.get("timestamp"))
+            return
+        self._writer_for(device_id).enqueue(insert_measurement, row)
+
+    def _handle_status(self, site_id, system, device_id, data, raw_payload) -> None:
+        self._writer_for(device_id).enqueue(
+            insert_edge_status,
+            site_id,
+            device_id,
+            data,
+            raw_payload,
+            self._device_registered(device_id, data),
+        )
+
+    def _device_registered(self, device_id: str, data: Dict[str, Any]) -> bool:
+        """True if the devices row already matches this status message."""
+        with self._device_cache_lock:
+            cached = self._device_cache.get(device_id)
+            if (
+                cached is None
+                or cached[0] != data.get("device_model")
+                or cached[1] != data.get("firmware_version")
+                or cached[2] <= time.monotonic()
+            ):
+                return False
+            self._device_cache.move_to_end(device_id)
+            return True
+
+    def _on_written(self, writer: Callable[..., None], args: Tuple[Any, ...]) -> None:
+        """Remember a device once its devices upsert has committed (writer threads)."""
+        if writer is not insert_edge_status:
+            return
+        site_id, device_id, data, raw_payload, registered = args
+        model = data.get("device_model")
+        if registered or not model:
+            return
+        with self._device_cache_lock:
+            self._device_cache[device_id] = (
+                model,
+                data.get("firmware_version"),
+                time.monotonic() + DEVICE_CACHE_TTL_S,
+            )
+            self._device_cache.move_to_end(device_id)
+            if len(self._device_cache) > DEVICE_CACHE_MAX_SIZE:
+                self._device_cache.popitem(last=False)
+
+    def _handle_config(self, site_id, system, device_id, data, raw_payload) -> None:
+        self._writer_for(device_id).enqueue(upsert_edge_config, site_id, device_id, raw_payload)
+
+    def _handle_ota(self, ota_type, site_id, system, device_id, data, raw_payload) -> None:
+        self._writer_for(device_id).enqueue(handle_ota_message, device_id, ota_type, data)
+        logger.info("OTA %s from %s/edge/%s", ota_type, site_id, device_id)
+
 
 # ---------------------------------------------------------------------
 # Entry point
@@ -5,17 +5,40 @@ Unit tests for the paku collector service.
 Tests cover:
   - Topic parsing (parse_topic)
   - Payload validation (validate_payload)
+  - Measurement row building (measurement_row)
+  - Binary COPY of measurement batches (copy_measurements)
+  - Prepared statement setup (configure_connection, insert_measurement)
+  - Raw jsonb parameters (RawJsonb and its dumpers)
+  - Batch coalescing in the DB writer (BatchWriter.write_batch)
+  - Retrying batches while Postgres is down (BatchWriter._flush_with_retry)
+  - OTA progress handling (handle_ota_message)
+  - MQTT callbacks (CollectorApp.on_connect, CollectorApp.on_message)
+  - Devices upsert cache (CollectorApp._device_registered)
+  - Per-device writer routing and draining on shutdown (CollectorApp._writer_for, start)
 
 Run:  python -m pytest test_collector.py -v
 """
 
+import contextlib
+import json
 import pytest
+import queue
 import sys
+import threading
 import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import orjson
+import psycopg
+from psycopg.adapt import PyFormat
+from psycopg.pq import Format
+from psycopg.types.json import Jsonb, JsonbBinaryDumper, JsonbDumper
 
 # Allow import of collector module from same directory
 sys.path.insert(0, os.path.dirname(__file__))
-from collector import parse_topic, validate_payload
+import collector
+from collector import BatchWriter, CollectorApp, load_config, measurement_row, parse_topic, validate_payload
 
 
 # =====================================================================
@@ -25,100 +48,742 @@ from collector import parse_topic, validate_payload
 class TestParseTopic:
     """Tests for MQTT topic parsing."""
 
-    def test_data_topic(self):
-        result = parse_topic("paku/ruuvi/van_inside/data")
-        assert result == ("paku", "ruuvi", "van_inside", "data")
+    @pytest.mark.parametrize("topic,expected", [
+        ("paku/ruuvi/van_inside/data", ("paku", "ruuvi", "van_inside", "data")),
+        ("paku/edge/ESP32-ABC123/status", ("paku", "edge", "ESP32-ABC123", "status")),
+        ("paku/edge/ESP32-ABC123/config", ("paku", "edge", "ESP32-ABC123", "config")),
+        ("paku/edge/ESP32-ABC123/ota/status", ("paku", "edge", "ESP32-ABC123", "ota_status")),
+        ("paku/edge/ESP32-ABC123/ota/progress", ("paku", "edge", "ESP32-ABC123", "ota_progress")),
+        ("paku/edge/ESP32-ABC123/ota/result", ("paku", "edge", "ESP32-ABC123", "ota_result")),
+        ("paku/heater/emu01/data", ("paku", "heater", "emu01", "data")),
+    ])
+    def test_supported_topic(self, topic, expected):
+        assert parse_topic(topic) == expected
+
+    @pytest.mark.parametrize("topic", [
+        "paku/ruuvi/van_inside/unknown",        # unknown topic type
+        "paku/ruuvi",                           # too few segments
+        "paku/ruuvi/van_inside/data/extra",     # too many segments, not OTA
+        "",
+        "paku//van_inside/data",                # empty segment
+        "paku/edge/ESP32-ABC123/ota/unknown",   # unknown OTA subtype
+        "paku/ruuvi/sensor1/ota/status",        # OTA but system is not "edge"
+    ])
+    def test_unsupported_topic_returns_none(self, topic):
+        assert parse_topic(topic) is None
+
+    def test_repeated_topic_is_cached(self):
+        parse_topic.cache_clear()
+        first = parse_topic("paku/ruuvi/van_inside/data")
+        assert parse_topic("paku/ruuvi/van_inside/data") is first
+        assert parse_topic.cache_info().hits == 1
 
-    def test_status_topic(self):
-        result = parse_topic("paku/edge/ESP32-ABC123/status")
-        assert result == ("paku", "edge", "ESP32-ABC123", "status")
 
-    def test_config_topic(self):
-        result = parse_topic("paku/edge/ESP32-ABC123/config")
-        assert result == ("paku", "edge", "ESP32-ABC123", "config")
+# =====================================================================
+# validate_payload
+# =====================================================================
 
-    def test_ota_status_topic(self):
-        result = parse_topic("paku/edge/ESP32-ABC123/ota/status")
-        assert result == ("paku", "edge", "ESP32-ABC123", "ota_status")
+class TestValidatePayload:
+    """Tests for sensor data payload validation."""
 
-    def test_ota_progress_topic(self):
-        result = parse_topic("paku/edge/ESP32-ABC123/ota/progress")
-        assert result == ("paku", "edge", "ESP32-ABC123", "ota_progress")
+    @pytest.mark.parametrize("payload,expected", [
+        pytest.param(
+            {"device_id": "ruuvi_cabin", "metrics": {"temperature_c": 21.5, "humidity_percent": 45.2}},
+            True, id="valid",
+        ),
+        pytest.param({"metrics": {"temperature_c": 21.5}}, False, id="missing_device_id"),
+        pytest.param({"device_id": "ruuvi_cabin"}, False, id="missing_metrics"),
+        pytest.param({"device_id": "ruuvi_cabin", "metrics": "not_a_dict"}, False, id="metrics_not_dict"),
+        pytest.param({"device_id": "ruuvi_cabin", "metrics": {}}, False, id="metrics_empty"),
+        pytest.param(
+            {
+                "device_id": "ruuvi_cabin",
+                "metrics": {"temperature_c": 21.5},
+                "timestamp": "2025-12-01T20:00:00Z",
+                "location": "cabin",
+                "mac": "AA:BB:CC:DD:EE:FF",
+            },
+            True, id="extra_fields_are_ok",
+        ),
+        pytest.param({}, False, id="empty_payload"),
+        pytest.param({"device_id": "sensor1", "metrics": {"battery_mv": 2870}}, True, id="single_metric"),
+    ])
+    def test_validate_payload(self, payload, expected):
+        assert validate_payload(payload) is expected
 
-    def test_ota_result_topic(self):
-        result = parse_topic("paku/edge/ESP32-ABC123/ota/result")
-        assert result == ("paku", "edge", "ESP32-ABC123", "ota_result")
 
-    def test_unknown_topic_type_returns_none(self):
-        assert parse_topic("paku/ruuvi/van_inside/unknown") is None
+# =====================================================================
+# measurement_row
+# =====================================================================
 
-    def test_too_few_segments_returns_none(self):
-        assert parse_topic("paku/ruuvi") is None
+class TestMeasurementRow:
+    """Tests for building binary-COPY-ready measurement rows."""
 
-    def test_too_many_segments_non_ota_returns_none(self):
-        assert parse_topic("paku/ruuvi/van_inside/data/extra") is None
+    def test_timestamp_is_parsed(self):
+        row = measurement_row("paku", "ruuvi", "cabin", {
+            "metrics": {"temperature_c": 21.5},
+            "timestamp": "2025-12-01T20:00:00Z",
+        })
+        assert row[5] == datetime(2025, 12, 1, 20, 0, tzinfo=timezone.utc)
+        assert row[6].obj == {"temperature_c": 21.5}
 
-    def test_empty_string_returns_none(self):
-        assert parse_topic("") is None
+    def test_naive_timestamp_is_utc(self):
+        row = measurement_row("paku", "ruuvi", "cabin", {
+            "metrics": {"t": 1},
+            "timestamp": "2025-12-01T20:00:00",
+        })
+        assert row[5].tzinfo is timezone.utc
 
-    def test_unknown_ota_subtype_returns_none(self):
-        assert parse_topic("paku/edge/ESP32-ABC123/ota/unknown") is None
+    def test_missing_timestamp_uses_now(self):
+        row = measurement_row("paku", "ruuvi", "cabin", {"metrics": {"t": 1}})
+        assert row[5].tzinfo is not None
 
-    def test_ota_wrong_system_returns_none(self):
-        # OTA 5-segment but system is not "edge"
-        assert parse_topic("paku/ruuvi/sensor1/ota/status") is None
+    def test_invalid_timestamp_raises(self):
+        with pytest.raises(ValueError):
+            measurement_row("paku", "ruuvi", "cabin", {"metrics": {"t": 1}, "timestamp": "garbage"})
 
-    def test_heater_data_topic(self):
-        result = parse_topic("paku/heater/emu01/data")
-        assert result == ("paku", "heater", "emu01", "data")
+    def test_text_columns_are_strings(self):
+        row = measurement_row("paku", "ruuvi", "cabin", {"metrics": {"t": 1}, "location": 5})
+        assert row[3] == "5"
+        assert row[4] is None
 
 
 # =====================================================================
-# validate_payload
+# BatchWriter.write_batch
 # =====================================================================
 
-class TestValidatePayload:
-    """Tests for sensor data payload validation."""
+class FakeConnection:
+    broken = False
+
+    def __init__(self):
+        self.cursors = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        cur = FakeCursor(self)
+        self.cursors.append(cur)
+        return cur
+
+    def pipeline(self):
+        return contextlib.nullcontext()
 
-    def test_valid_payload(self):
-        payload = {
-            "device_id": "ruuvi_cabin",
-            "metrics": {"temperature_c": 21.5, "humidity_percent": 45.2},
-        }
-        assert validate_payload(payload) is True
+    @contextlib.contextmanager
+    def transaction(self):
+        try:
+            yield
+        except BaseException:
+            self.rollbacks += 1
+            raise
 
-    def test_missing_device_id(self):
-        payload = {"metrics": {"temperature_c": 21.5}}
-        assert validate_payload(payload) is False
 
-    def test_missing_metrics(self):
-        payload = {"device_id": "ruuvi_cabin"}
-        assert validate_payload(payload) is False
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.executed = []
+        self.copies = []
 
-    def test_metrics_not_dict(self):
-        payload = {"device_id": "ruuvi_cabin", "metrics": "not_a_dict"}
-        assert validate_payload(payload) is False
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
 
-    def test_metrics_empty(self):
-        payload = {"device_id": "ruuvi_cabin", "metrics": {}}
-        assert validate_payload(payload) is False
+    def copy(self, statement):
+        copy = FakeCopy(statement)
+        self.copies.append(copy)
+        return copy
 
-    def test_extra_fields_are_ok(self):
-        payload = {
-            "device_id": "ruuvi_cabin",
+
+class FakeCopy:
+    def __init__(self, statement):
+        self.statement = statement
+        self.types = None
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_types(self, types):
+        self.types = types
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+
+class FakePool:
+    def __init__(self):
+        self.checkouts = 0
+        self.connections = []
+
+    @contextlib.contextmanager
+    def connection(self, timeout=None):
+        self.checkouts += 1
+        conn = FakeConnection()
+        self.connections.append(conn)
+        yield conn
+
+    def open(self, wait=False):
+        pass
+
+    def close(self):
+        pass
+
+
+def _rows(n):
+    return [
+        measurement_row("paku", "ruuvi", f"dev{i}", {"metrics": {"t": i}, "timestamp": "2025-12-01T20:00:00Z"})
+        for i in range(n)
+    ]
+
+
+class TestCopyMeasurements:
+    """Tests for the binary COPY used for measurement batches."""
+
+    def test_rows_written_with_one_binary_copy(self):
+        cur = FakeConnection().cursor()
+        rows = _rows(3)
+        collector.copy_measurements(cur, rows)
+        [copy] = cur.copies
+        assert copy.statement is collector.COPY_MEASUREMENTS_SQL
+        assert "FORMAT BINARY" in copy.statement
+        assert copy.types == collector.MEASUREMENT_TYPES
+        assert copy.rows == rows
+
+    def test_copy_skips_synchronous_commit(self):
+        cur = FakeConnection().cursor()
+        collector.copy_measurements(cur, _rows(1))
+        assert cur.executed == [("SET LOCAL synchronous_commit = off", None)]
+
+
+class TestPreparedStatements:
+    """Tests that statements are prepared server-side and reused."""
+
+    def test_connections_prepare_on_first_use(self):
+        conn = SimpleNamespace(prepare_threshold=5)
+        collector.configure_connection(conn)
+        assert conn.prepare_threshold == 0
+
+    def test_insert_uses_the_module_sql_constant(self):
+        cur = FakeConnection().cursor()
+        for row in _rows(2):
+            collector.insert_measurement(cur, row)
+        assert len(cur.executed) == 2
+        assert all(query is collector.INSERT_MEASUREMENT_SQL for query, params in cur.executed)
+
+
+class TestRawJsonb:
+    """Tests for binding already-encoded MQTT bytes as jsonb."""
+
+    PAYLOAD = b'{"state": "COLLECT", "uptime_s": 12345}'
+
+    def test_text_dump_is_the_raw_bytes(self):
+        dumper = psycopg.adapters.get_dumper(collector.RawJsonb, PyFormat.TEXT)(collector.RawJsonb)
+        assert dumper.dump(collector.RawJsonb(self.PAYLOAD)) == self.PAYLOAD
+
+    def test_binary_dump_adds_the_jsonb_version_byte(self):
+        dumper = psycopg.adapters.get_dumper(collector.RawJsonb, PyFormat.BINARY)(collector.RawJsonb)
+        assert dumper.dump(collector.RawJsonb(self.PAYLOAD)) == b"\x01" + self.PAYLOAD
+
+    def test_jsonb_oid_keeps_psycopg_dumpers(self):
+        oid = psycopg.adapters.types["jsonb"].oid
+        assert psycopg.adapters.get_dumper_by_oid(oid, Format.BINARY) is JsonbBinaryDumper
+        assert psycopg.adapters.get_dumper_by_oid(oid, Format.TEXT) is JsonbDumper
+
+    def test_jsonb_values_keep_psycopg_dumpers(self):
+        assert psycopg.adapters.get_dumper(Jsonb, PyFormat.BINARY) is JsonbBinaryDumper
+
+
+class TestBatchWriter:
+    """Tests that a batch of queued writes costs one DB round trip."""
+
+    @pytest.fixture
+    def copies(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(collector, "copy_measurements", lambda cur, rows: calls.append(list(rows)))
+        return calls
+
+    def test_measurements_coalesced_into_one_copy(self, copies):
+        pool = FakePool()
+        writer = BatchWriter(pool)
+        writer.write_batch([(collector.insert_measurement, (row,)) for row in _rows(1000)])
+        assert len(copies) == 1
+        assert len(copies[0]) == 1000
+        assert pool.checkouts == 1
+        assert writer._inserted == 1000
+
+    def test_other_writes_stay_out_of_the_copy(self, copies):
+        calls = []
+        writer = BatchWriter(FakePool())
+        writer.write_batch([
+            (collector.insert_measurement, (_rows(1)[0],)),
+            (lambda cur, *args: calls.append(args), ("E1",)),
+            (collector.insert_measurement, (_rows(1)[0],)),
+        ])
+        assert [len(rows) for rows in copies] == [2]
+        assert calls == [("E1",)]
+        assert writer._written == 1
+
+    def test_failed_copy_falls_back_to_inserts(self, monkeypatch):
+        def reject(cur, rows):
+            raise psycopg.DataError("bad row")
+
+        monkeypatch.setattr(collector, "copy_measurements", reject)
+        pool = FakePool()
+        writer = BatchWriter(pool)
+        writer.write_batch([(collector.insert_measurement, (row,)) for row in _rows(3)])
+        [cur] = pool.connections[0].cursors
+        assert [query for query, params in cur.executed] == [collector.INSERT_MEASUREMENT_SQL] * 3
+        assert writer._inserted == 3
+
+    def test_failing_write_only_loses_itself(self):
+        calls = []
+
+        def write(cur, name):
+            calls.append(name)
+
+        def poison(cur, name):
+            raise AttributeError(name)
+
+        pool = FakePool()
+        writer = BatchWriter(pool)
+        writer.write_batch([(write, ("A",)), (poison, ("X",)), (write, ("B",))])
+        [conn] = pool.connections
+        # The pipelined attempt is rolled back, then A and B go one by one
+        assert conn.rollbacks == 1
+        assert calls == ["A", "A", "B"]
+        assert writer._written == 2
+
+    def test_empty_batch_skips_the_db(self, copies):
+        pool = FakePool()
+        BatchWriter(pool).write_batch([])
+        assert copies == []
+        assert pool.checkouts == 0
+
+
+class TestHandleOtaMessage:
+    """Tests for mapping OTA messages onto device_update_status."""
+
+    @pytest.mark.parametrize("state,status", [
+        ("installing", "installing"),
+        ("VERIFYING", "downloaded"),
+        (None, "downloading"),
+    ])
+    def test_progress_state(self, state, status):
+        cur = FakeConnection().cursor()
+        collector.handle_ota_message(cur, "ESP32-ABC123", "progress", {"state": state, "percent": 40})
+        [(query, params)] = cur.executed
+        assert query is collector.UPDATE_OTA_PROGRESS_SQL
+        assert params[0] == status
+
+
+class FlakyPool(FakePool):
+    """FakePool whose first checkouts fail with the given errors."""
+
+    def __init__(self, *errors):
+        super().__init__()
+        self.errors = list(errors)
+        self.timeouts = []
+
+    @contextlib.contextmanager
+    def connection(self, timeout=None):
+        self.timeouts.append(timeout)
+        if self.errors:
+            raise self.errors.pop(0)
+        with super().connection(timeout) as conn:
+            yield conn
+
+
+class FakeClock:
+    """Stands in for time.monotonic; waiting just moves it forward."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.waits = []
+
+    def monotonic(self):
+        return self.now
+
+
+class ClockedEvent(threading.Event):
+    """A writer's closing event whose wait() advances a FakeClock."""
+
+    def __init__(self, clock, on_wait=None):
+        super().__init__()
+        self.clock = clock
+        self.on_wait = on_wait
+
+    def wait(self, timeout=None):
+        self.clock.waits.append(timeout)
+        self.clock.now += timeout
+        if self.on_wait:
+            self.on_wait()
+        return self.is_set()
+
+
+def _down():
+    return psycopg.OperationalError("connection refused")
+
+
+class TestFlushRetry:
+    """Tests for holding a batch while Postgres is unreachable."""
+
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        clock = FakeClock()
+        monkeypatch.setattr(collector, "time", clock)
+        return clock
+
+    @pytest.fixture
+    def applied(self):
+        return []
+
+    def _writer(self, pool, clock, on_wait=None):
+        writer = BatchWriter(pool)
+        writer._closing = ClockedEvent(clock, on_wait)
+        return writer
+
+    def _writes(self, applied, *names):
+        return [(lambda cur, name: applied.append(name), (name,)) for name in names]
+
+    def test_retries_with_backoff_until_the_db_is_back(self, clock, applied):
+        pool = FlakyPool(_down(), collector.PoolTimeout("no connection"))
+        writer = self._writer(pool, clock)
+        writer.write_batch(self._writes(applied, "A", "B"))
+        assert clock.waits == [1.0, 2.0]
+        assert applied == ["A", "B"]
+        assert writer._written == 2
+        assert writer._dropped == 0
+
+    def test_gives_up_after_the_retry_timeout(self, clock, applied):
+        writer = self._writer(FlakyPool(*(_down() for _ in range(20))), clock)
+        writer.write_batch(self._writes(applied, "A", "B"))
+        assert clock.waits == [1.0, 2.0, 4.0, 8.0, 16.0, 30.0, 30.0]
+        assert sum(clock.waits) <= collector.DB_RETRY_TIMEOUT_S
+        assert applied == []
+        assert writer._dropped == 2
+
+    def test_rows_written_before_a_disconnect_are_not_repeated(self, clock, monkeypatch):
+        def reject(cur, rows):
+            raise psycopg.DataError("bad row")
+
+        inserted = []
+        disconnects = []
+
+        def execute(cur, query, params=None):
+            if params[2] == "dev1" and not disconnects:
+                disconnects.append(params)
+                cur.connection.broken = True
+                raise psycopg.OperationalError("server closed the connection unexpectedly")
+            inserted.append(params[2])
+
+        monkeypatch.setattr(collector, "copy_measurements", reject)
+        monkeypatch.setattr(FakeCursor, "execute", execute)
+        pool = FakePool()
+        writer = self._writer(pool, clock)
+        writer.write_batch([(collector.insert_measurement, (row,)) for row in _rows(3)])
+        assert inserted == ["dev0", "dev1", "dev2"]
+        assert writer._inserted == 3
+        assert pool.checkouts == 2
+
+    def test_writes_before_a_disconnect_are_not_repeated(self, clock, applied, monkeypatch):
+        disconnects = []
+
+        def write(cur, name):
+            if name == "B" and not disconnects:
+                disconnects.append(name)
+                cur.connection.broken = True
+                raise psycopg.OperationalError("server closed the connection unexpectedly")
+            applied.append(name)
+
+        monkeypatch.setattr(psycopg.Pipeline, "is_supported", staticmethod(lambda: False))
+        writer = self._writer(FakePool(), clock)
+        writer.write_batch([(write, (name,)) for name in ("A", "B", "C")])
+        assert applied == ["A", "B", "C"]
+        assert writer._written == 3
+
+    def test_closed_writer_tries_once(self, clock, applied):
+        pool = FlakyPool(_down(), _down())
+        writer = self._writer(pool, clock)
+        writer.close()
+        writer.write_batch(self._writes(applied, "A"))
+        assert pool.timeouts == [collector.DB_RETRY_MIN_DELAY_S]
+        assert clock.waits == []
+        assert writer._dropped == 1
+
+    def test_close_during_backoff_gets_one_last_attempt(self, clock, applied):
+        pool = FlakyPool(_down(), _down(), _down())
+        writer = self._writer(pool, clock, on_wait=lambda: writer.close())
+        writer.write_batch(self._writes(applied, "A"))
+        assert pool.timeouts == [None, collector.DB_RETRY_MIN_DELAY_S]
+        assert writer._dropped == 1
+
+    def test_closed_writer_still_writes_when_the_db_is_up(self, clock, applied):
+        writer = self._writer(FakePool(), clock)
+        writer.close()
+        writer.write_batch(self._writes(applied, "A"))
+        assert applied == ["A"]
+
+
+# =====================================================================
+# CollectorApp MQTT callbacks
+# =====================================================================
+
+_TEST_ENV = {"PGUSER": "paku", "PGPASSWORD": "paku", "PGDATABASE": "paku"}
+
+
+@pytest.fixture(scope="module")
+def collector_app():
+    """One CollectorApp (closed pool, unconnected MQTT client) per module."""
+    with pytest.MonkeyPatch.context() as mp:
+        for name, value in _TEST_ENV.items():
+            mp.setenv(name, value)
+        yield CollectorApp(load_config())
+
+
+@pytest.fixture
+def app(collector_app):
+    """The shared CollectorApp with empty writer queues and device cache."""
+    _drain(collector_app)
+    collector_app._device_cache.clear()
+    return collector_app
+
+
+def _drain(app):
+    for writer in app.writers:
+        while not writer.q.empty():
+            writer.q.get_nowait()
+            writer.q.task_done()
+
+
+def _publish(app, topic, payload):
+    app.on_message(None, None, SimpleNamespace(topic=topic, payload=payload))
+
+
+def _queued(app):
+    """Every (writer, args) waiting in the app's writer queues."""
+    return [item for writer in app.writers for item in writer.q.queue]
+
+
+class FakeMqttClient:
+    def __init__(self):
+        self.subscribed = []
+
+    def subscribe(self, topic):
+        self.subscribed.append(topic)
+
+    def reconnect_delay_set(self, min_delay, max_delay):
+        pass
+
+    def connect(self, host, port, keepalive):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def loop_start(self):
+        pass
+
+    def loop_stop(self):
+        pass
+
+
+@pytest.fixture
+def stopped_app(monkeypatch):
+    """A fresh three-writer CollectorApp on fakes whose start() shuts down at once."""
+    for name, value in _TEST_ENV.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv("DB_WRITERS", "3")
+    monkeypatch.setattr(collector.signal, "signal", lambda signum, handler: None)
+    app = CollectorApp(load_config())
+    app.pool = FakePool()
+    for writer in app.writers:
+        writer.pool = app.pool
+    app.client = FakeMqttClient()
+    app._stop.set()
+    return app
+
+
+class TestOnConnect:
+    """Tests for (re)subscribing when the broker connection comes up."""
+
+    def test_success_subscribes_to_every_pattern(self, app):
+        client = FakeMqttClient()
+        app.on_connect(client, None, None, SimpleNamespace(is_failure=False), None)
+        assert client.subscribed == app.cfg["mqtt_topic_patterns"]
+
+    def test_failure_subscribes_to_nothing(self, app):
+        client = FakeMqttClient()
+        app.on_connect(client, None, None, SimpleNamespace(is_failure=True), None)
+        assert client.subscribed == []
+
+
+class TestOnMessage:
+    """Tests for routing MQTT messages onto the writer queues."""
+
+    @pytest.mark.parametrize("dumps", [lambda obj: json.dumps(obj).encode(), orjson.dumps])
+    def test_data_message_queues_measurement(self, app, dumps):
+        _publish(app, "paku/ruuvi/van_inside/data", dumps({
+            "device_id": "van_inside",
             "metrics": {"temperature_c": 21.5},
             "timestamp": "2025-12-01T20:00:00Z",
-            "location": "cabin",
-            "mac": "AA:BB:CC:DD:EE:FF",
-        }
-        assert validate_payload(payload) is True
+        }))
+        [(writer, (row,))] = _queued(app)
+        assert writer is collector.insert_measurement
+        assert row[:3] == ("paku", "ruuvi", "van_inside")
+        assert row[6].obj == {"temperature_c": 21.5}
+
+    def test_status_message_keeps_raw_payload(self, app):
+        payload = orjson.dumps({"device_model": "esp32", "firmware_version": "1.0"})
+        _publish(app, "paku/edge/ESP32-ABC123/status", payload)
+        [(writer, args)] = _queued(app)
+        assert writer is collector.insert_edge_status
+        assert args[:2] == ("paku", "ESP32-ABC123")
+        assert args[3] is payload
+
+    def test_invalid_json_is_dropped(self, app):
+        _publish(app, "paku/ruuvi/van_inside/data", b"{not json")
+        assert _queued(app) == []
+
+    def test_non_object_is_dropped(self, app):
+        _publish(app, "paku/ruuvi/van_inside/data", b"[1, 2, 3]")
+        assert _queued(app) == []
+
+    def test_oversized_payload_is_dropped(self, app):
+        payload = b'{"device_id": "d", "metrics": {"x": "' + b"a" * collector.MAX_PAYLOAD_BYTES + b'"}}'
+        _publish(app, "paku/ruuvi/van_inside/data", payload)
+        assert _queued(app) == []
 
-    def test_empty_payload(self):
-        assert validate_payload({}) is False
+    def test_invalid_payload_is_dropped(self, app):
+        _publish(app, "paku/ruuvi/van_inside/data", orjson.dumps({"device_id": "d", "metrics": {}}))
+        assert _queued(app) == []
 
-    def test_single_metric(self):
-        payload = {"device_id": "sensor1", "metrics": {"battery_mv": 2870}}
-        assert validate_payload(payload) is True
+    def test_unsupported_topic_is_ignored(self, app):
+        _publish(app, "paku/ruuvi/van_inside/unknown", orjson.dumps({"device_id": "d"}))
+        assert _queued(app) == []
+
+
+_STATUS_TOPIC = "paku/edge/ESP32-ABC123/status"
+
+
+def _status(firmware="1.0"):
+    return orjson.dumps({"device_model": "esp32", "firmware_version": firmware})
+
+
+def _write_queued(app):
+    """Flush everything queued through a BatchWriter reporting back to the app."""
+    BatchWriter(FakePool(), on_written=app._on_written).write_batch(_queued(app))
+    _drain(app)
+
+
+class TestDeviceCache:
+    """Tests for skipping the devices upsert for already registered devices."""
+
+    def _registered(self, app, firmware="1.0"):
+        _publish(app, _STATUS_TOPIC, _status(firmware))
+        writer, args = _queued(app)[-1]
+        return args[4]
+
+    def test_unknown_device_is_registered(self, app):
+        assert self._registered(app) is False
+
+    def test_not_cached_until_written(self, app):
+        self._registered(app)
+        assert self._registered(app) is False
+
+    def test_written_device_is_a_hit(self, app):
+        self._registered(app)
+        _write_queued(app)
+        assert self._registered(app) is True
+
+    def test_firmware_change_is_a_miss(self, app):
+        self._registered(app)
+        _write_queued(app)
+        assert self._registered(app, firmware="1.1") is False
+
+    def test_entry_expires(self, app, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr(collector, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+        self._registered(app)
+        _write_queued(app)
+        clock[0] += collector.DEVICE_CACHE_TTL_S
+        assert self._registered(app) is False
+
+    def test_rejected_write_is_not_cached(self, app, monkeypatch):
+        def reject(cur, query, params=None):
+            raise psycopg.DataError("bad status")
+
+        self._registered(app)
+        monkeypatch.setattr(FakeCursor, "execute", reject)
+        _write_queued(app)
+        assert self._registered(app) is False
+
+    def test_least_recently_seen_device_is_evicted(self, app, monkeypatch):
+        monkeypatch.setattr(collector, "DEVICE_CACHE_MAX_SIZE", 2)
+        for device_id in ("A", "B"):
+            _publish(app, f"paku/edge/{device_id}/status", _status())
+            _write_queued(app)
+        assert app._device_registered("A", orjson.loads(_status()))
+        _publish(app, "paku/edge/C/status", _status())
+        _write_queued(app)
+        assert list(app._device_cache) == ["A", "C"]
+
+
+class FakeWriter:
+    def __init__(self, name, events):
+        self.name = name
+        self.events = events
+        self.q = queue.Queue()
+
+    def start(self):
+        self.events.append(("start", self.name))
+
+    def close(self):
+        self.events.append(("close", self.name))
+
+    def join(self):
+        self.events.append(("join", self.name))
+
+
+class TestWriterRouting:
+    """Tests for spreading devices over the writer threads."""
+
+    def test_device_always_maps_to_the_same_writer(self, stopped_app):
+        for i in range(50):
+            device_id = f"ruuvi_{i}"
+            assert stopped_app._writer_for(device_id) is stopped_app._writer_for(device_id)
+
+    def test_device_writes_share_one_queue(self, stopped_app):
+        for i in range(5):
+            _publish(stopped_app, "paku/ruuvi/van_inside/data", orjson.dumps({
+                "device_id": "van_inside",
+                "metrics": {"t": i},
+            }))
+        _publish(stopped_app, "paku/edge/van_inside/config", b"{}")
+        [pending] = [w.q.queue for w in stopped_app.writers if w.q.qsize()]
+        assert [args[0][6].obj["t"] for writer, args in list(pending)[:5]] == [0, 1, 2, 3, 4]
+        assert pending[5][0] is collector.upsert_edge_config
+
+    def test_shutdown_drains_the_queues(self, stopped_app, monkeypatch):
+        copied = []
+        monkeypatch.setattr(collector, "copy_measurements", lambda cur, rows: copied.extend(rows))
+        for i in range(20):
+            _publish(stopped_app, f"paku/ruuvi/sensor{i}/data", orjson.dumps({
+                "device_id": f"sensor{i}",
+                "metrics": {"t": i},
+            }))
+        stopped_app.start()
+        assert sorted(row[2] for row in copied) == sorted(f"sensor{i}" for i in range(20))
+        assert all(w.q.unfinished_tasks == 0 for w in stopped_app.writers)
+
+    def test_shutdown_closes_then_joins_every_writer(self, stopped_app):
+        events = []
+        stopped_app.writers = [FakeWriter(i, events) for i in range(3)]
+        stopped_app.start()
+        assert events == (
+            [("start", i) for i in range(3)]
+            + [("close", i) for i in range(3)]
+            + [("join", i) for i in range(3)]
+        )
 
 
 # =====================================================================
@@ -7,6 +7,21 @@ This test can be run without external dependencies.
 import sys
 import json
 
+# (field, accepted types, type names for the error message), built once
+_REQUIRED_FIELDS = tuple(
+    (field, types, ' or '.join(t.__name__ for t in types))
+    for field, types in (
+        ('sensor_id', (str,)),
+        ('temperature_c', (int, float)),
+        ('humidity_percent', (int, float)),
+        ('pressure_hpa', (int, float)),
+        ('battery_mv', (int,)),
+    )
+)
+
+_MISSING = object()
+
+
 # Import the validation function (mock version for testing without paho-mqtt)
 def validate_message(payload):
     """
@@ -18,26 +33,14 @@ def validate_message(payload):
     Returns:
         Tuple of (is_valid, error_message)
     """
-    required_fields = {
-        'sensor_id': str,
-        'temperature_c': (int, float),
-        'humidity_percent': (int, float),
-        'pressure_hpa': (int, float),
-        'battery_mv': int,
-    }
-    
-    # Check for missing required fields
-    for field, expected_type in required_fields.items():
-        if field not in payload:
+    for field, types, expected_names in _REQUIRED_FIELDS:
+        value = payload.get(field, _MISSING)
+        if value is _MISSING:
             return False, f"Missing required field: {field}"
         
         # Validate type
-        if not isinstance(payload[field], expected_type):
-            actual_type = type(payload[field]).__name__
-            if isinstance(expected_type, tuple):
-                expected_names = ' or '.join(t.__name__ for t in expected_type)
-            else:
-                expected_names = expected_type.__name__
+        if not isinstance(value, types):
+            actual_type = type(value).__name__
             return False, f"Field '{field}' has incorrect type: expected {expected_names}, got {actual_type}"
     
     return True, None
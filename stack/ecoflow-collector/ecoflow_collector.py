@@ -7,18 +7,16 @@ power summary to the local MQTT broker on `paku/ecoflow/{sn}/power` so
 the ESP van-display and Home Assistant dashboard tiles can render live.
 """
 
-import hashlib
 import hmac
-import json
 import logging
 import os
-import random
-import string
+import secrets
 import sys
 import time
 from datetime import datetime
 from typing import Any, Dict, Optional
 
+import orjson
 import paho.mqtt.client as mqtt
 import psycopg
 import requests
@@ -61,30 +59,26 @@ def load_config() -> Dict[str, Any]:
 class EcoFlowAPI:
     def __init__(self, access_key: str, secret_key: str, base_url: str):
         self.access_key = access_key
-        self.secret_key = secret_key
+        self._secret_key_bytes = secret_key.encode('utf-8')
+        # Signed string is the sorted params accessKey, nonce, timestamp;
+        # only nonce and timestamp change per request
+        self._sign_prefix = f"accessKey={access_key}&nonce="
         self.base_url = base_url.rstrip('/')
-
-    def _generate_sign(self, params: Dict[str, str]) -> str:
-        sorted_params = sorted(params.items())
-        param_str = "&".join(f"{k}={v}" for k, v in sorted_params)
-        signature = hmac.new(
-            self.secret_key.encode('utf-8'),
-            param_str.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        return signature
-
-    def _make_api_request(self, endpoint: str, method: str = "GET", body: Optional[Dict] = None) -> Dict[str, Any]:
-        nonce = ''.join(random.choices(string.ascii_letters + string.digits, k=16))
+        self._quota_all_url = f"{self.base_url}/iot-open/sign/device/quota/all?sn="
+        # Keep-alive connection pool: later polls skip the TCP + TLS handshake
+        self.session = requests.Session()
+
+    def _generate_sign(self, nonce: str, timestamp: str) -> str:
+        param_str = f"{self._sign_prefix}{nonce}&timestamp={timestamp}"
+        # One-shot OpenSSL HMAC; no hmac.HMAC object per request
+        return hmac.digest(self._secret_key_bytes, param_str.encode('utf-8'), 'sha256').hex()
+
+    def _make_api_request(self, url: str, method: str = "GET", body: Optional[Dict] = None) -> Dict[str, Any]:
+        # 16 hex chars from the OS CSPRNG in one call
+        nonce = secrets.token_hex(8)
         timestamp = str(int(time.time() * 1000))
 
-        params = {
-            "accessKey": self.access_key,
-            "nonce": nonce,
-            "timestamp": timestamp
-        }
-
-        sign = self._generate_sign(params)
+        sign = self._generate_sign(nonce, timestamp)
 
         headers = {
             "accessKey": self.access_key,
@@ -94,18 +88,17 @@ class EcoFlowAPI:
             "Content-Type": "application/json"
         }
 
-        url = f"{self.base_url}{endpoint}"
-
         try:
             if method == "GET":
-                response = requests.get(url, headers=headers, timeout=30)
+                response = self.session.get(url, headers=headers, timeout=30)
             elif method == "POST":
-                response = requests.post(url, headers=headers, json=body or {}, timeout=30)
+                response = self.session.post(url, headers=headers, json=body or {}, timeout=30)
             else:
                 raise ValueError(f"Unsupported method: {method}")
 
             response.raise_for_status()
-            data = response.json()
+            # orjson parses the raw body bytes without a str decode
+            data = orjson.loads(response.content)
 
             if data.get("code") != "0":
                 logger.warning("API returned error code: %s, message: %s", data.get("code"), data.get("message"))
@@ -116,13 +109,67 @@ class EcoFlowAPI:
         except requests.exceptions.RequestException as e:
             logger.error("API request failed: %s", e)
             return {}
+        except orjson.JSONDecodeError as e:
+            logger.error("API returned invalid JSON: %s", e)
+            return {}
 
     def get_device_quota_all(self, device_sn: str) -> Dict[str, Any]:
-        endpoint = f"/iot-open/sign/device/quota/all?sn={device_sn}"
-        return self._make_api_request(endpoint, method="GET")
+        return self._make_api_request(self._quota_all_url + device_sn, method="GET")
 
 
-def insert_ecoflow_measurement(conn: psycopg.Connection, device_sn: str, data: Dict[str, Any]) -> None:
+# (column, EcoFlow API key, value when the key is missing), in column order.
+# The API returns flat field names with dots.
+ECOFLOW_FIELDS = (
+    # Battery info
+    ("soc_percent", "bmsMaster.soc", 0),
+    ("remain_time_min", "pd.remainTime", 0),  # in minutes
+    # EcoFlow's summary fields
+    ("watts_in_sum", "pd.wattsInSum", 0),
+    ("watts_out_sum", "pd.wattsOutSum", 0),
+    # Individual components
+    ("ac_out_watts", "inv.outputWatts", 0),
+    ("pv_in_watts", "mppt.inWatts", 0),
+    ("car_watts", "pd.carWatts", 0),
+    # USB/TypeC outputs
+    ("usb1_watts", "pd.usb1Watts", 0),
+    ("usb2_watts", "pd.usb2Watts", 0),
+    ("qcusb1_watts", "pd.qcUsb1Watts", 0),
+    ("qcusb2_watts", "pd.qcUsb2Watts", 0),
+    ("typec1_watts", "pd.typec1Watts", 0),
+    ("typec2_watts", "pd.typec2Watts", 0),
+    # Temperature & power/voltage/BMS – extracted to dedicated columns so
+    # Grafana can query via index rather than scanning raw_data JSONB
+    ("inv_out_temp", "inv.outTemp", None),
+    ("bms_temp", "bmsMaster.temp", None),
+    ("bms_max_cell_temp", "bmsMaster.maxCellTemp", None),
+    ("bms_min_cell_temp", "bmsMaster.minCellTemp", None),
+    ("mppt_temp", "mppt.mpptTemp", None),
+    ("inv_input_watts", "inv.inputWatts", None),
+    ("inv_ac_in_vol", "inv.acInVol", None),
+    ("inv_out_vol", "inv.invOutVol", None),
+    ("inv_ac_in_amp", "inv.acInAmp", None),
+    ("inv_out_amp", "inv.invOutAmp", None),
+    ("bms_amp", "bmsMaster.amp", None),
+    ("bms_vol", "bmsMaster.vol", None),
+    ("bms_min_cell_vol", "bmsMaster.minCellVol", None),
+    ("bms_max_cell_vol", "bmsMaster.maxCellVol", None),
+    ("bms_remain_cap", "bmsMaster.remainCap", None),
+    ("bms_full_cap", "bmsMaster.fullCap", None),
+    ("bms_cycles", "bmsMaster.cycles", None),
+)
+
+# Computed from the USB/TypeC/car outputs above, appended after them
+ECOFLOW_SUM_COLUMNS = ("dc_out_watts", "typec_out_watts", "usb_out_watts")
+
+_ECOFLOW_COLUMNS = ("device_sn", "ts") + tuple(f[0] for f in ECOFLOW_FIELDS) + ECOFLOW_SUM_COLUMNS
+
+INSERT_ECOFLOW_MEASUREMENT_SQL = f"""
+    INSERT INTO ecoflow_measurements ({", ".join(_ECOFLOW_COLUMNS)})
+    VALUES ({", ".join(["%s"] * len(_ECOFLOW_COLUMNS))})
+"""
+
+
+def insert_ecoflow_measurement(cur: psycopg.Cursor, device_sn: str, data: Dict[str, Any]) -> None:
     """
     Insert EcoFlow measurement into database.
 
@@ -136,101 +183,27 @@ def insert_ecoflow_measurement(conn: psycopg.Connection, device_sn: str, data: D
     - pd.carWatts: 12V car output
     - bmsMaster.soc: Battery SOC %
     - pd.remainTime: Remaining time in minutes
-    """
 
-    # Battery info
-    soc = data.get('bmsMaster.soc', 0)
-    remain_time = data.get('pd.remainTime', 0)  # in minutes
-
-    # Use EcoFlow's summary fields first, fall back to individual components
-    watts_in_sum = data.get('pd.wattsInSum', 0)
-    watts_out_sum = data.get('pd.wattsOutSum', 0)
-
-    # Individual components
-    ac_in_watts = data.get('inv.inputWatts', 0)
-    ac_out_watts = data.get('inv.outputWatts', 0)
-    pv_in_watts = data.get('mppt.inWatts', 0)
-    mppt_out_watts = data.get('mppt.outWatts', 0)
-    car_watts = data.get('pd.carWatts', 0)
-
-    # USB/TypeC outputs
-    usb1 = data.get('pd.usb1Watts', 0)
-    usb2 = data.get('pd.usb2Watts', 0)
-    qcusb1 = data.get('pd.qcUsb1Watts', 0)
-    qcusb2 = data.get('pd.qcUsb2Watts', 0)
-    typec1 = data.get('pd.typec1Watts', 0)
-    typec2 = data.get('pd.typec2Watts', 0)
-
-    # Calculate component sums
-    dc_out_watts = car_watts + usb1 + usb2 + qcusb1 + qcusb2
-    typec_out_watts = typec1 + typec2
-    usb_out_watts = usb1 + usb2 + qcusb1 + qcusb2
-
-    # Temperature & power/voltage/BMS – extracted to dedicated columns so
-    # Grafana can query via index rather than scanning raw_data JSONB
-    inv_temp = data.get('inv.outTemp')
-    mppt_temp = data.get('mppt.mpptTemp')
-    bms_temp = data.get('bmsMaster.temp')
-    bms_max_cell_temp = data.get('bmsMaster.maxCellTemp')
-    bms_min_cell_temp = data.get('bmsMaster.minCellTemp')
-
-    # Power / voltage / BMS fields
-    inv_input_watts = data.get('inv.inputWatts')
-    inv_ac_in_vol   = data.get('inv.acInVol')
-    inv_out_vol     = data.get('inv.invOutVol')
-    inv_ac_in_amp   = data.get('inv.acInAmp')
-    inv_out_amp     = data.get('inv.invOutAmp')
-    bms_amp         = data.get('bmsMaster.amp')
-    bms_vol         = data.get('bmsMaster.vol')
-    bms_min_cell_vol = data.get('bmsMaster.minCellVol')
-    bms_max_cell_vol = data.get('bmsMaster.maxCellVol')
-    bms_remain_cap  = data.get('bmsMaster.remainCap')
-    bms_full_cap    = data.get('bmsMaster.fullCap')
-    bms_cycles      = data.get('bmsMaster.cycles')
-
-    sql = """
-        INSERT INTO ecoflow_measurements (
-            device_sn, ts,
-            soc_percent, remain_time_min,
-            watts_in_sum, watts_out_sum,
-            ac_out_watts, dc_out_watts, typec_out_watts, usb_out_watts,
-            pv_in_watts, car_watts,
-            usb1_watts, usb2_watts, qcusb1_watts, qcusb2_watts,
-            typec1_watts, typec2_watts,
-            inv_out_temp, bms_temp, bms_max_cell_temp, bms_min_cell_temp, mppt_temp,
-            inv_input_watts, inv_ac_in_vol, inv_out_vol, inv_ac_in_amp, inv_out_amp,
-            bms_amp, bms_vol, bms_min_cell_vol, bms_max_cell_vol,
-            bms_remain_cap, bms_full_cap, bms_cycles
-        ) VALUES (
-            %s, %s,
-            %s, %s,
-            %s, %s,
-            %s, %s, %s, %s,
-            %s, %s,
-            %s, %s, %s, %s,
-            %s, %s,
-            %s, %s, %s, %s, %s,
-            %s, %s, %s, %s, %s,
-            %s, %s, %s, %s,
-            %s, %s, %s
-        )
+    See ECOFLOW_FIELDS for the full key -> column mapping.
     """
+    get = data.get
+    values = [get(key, default) for _, key, default in ECOFLOW_FIELDS]
 
-    with conn.cursor() as cur:
-        cur.execute(sql, (
-            device_sn, datetime.now(),
-            soc, remain_time,
-            watts_in_sum, watts_out_sum,
-            ac_out_watts, dc_out_watts, typec_out_watts, usb_out_watts,
-            pv_in_watts, car_watts,
-            usb1, usb2, qcusb1, qcusb2,
-            typec1, typec2,
-            inv_temp, bms_temp, bms_max_cell_temp, bms_min_cell_temp, mppt_temp,
-            inv_input_watts, inv_ac_in_vol, inv_out_vol, inv_ac_in_amp, inv_out_amp,
-            bms_amp, bms_vol, bms_min_cell_vol, bms_max_cell_vol,
-            bms_remain_cap, bms_full_cap, bms_cycles
-        ))
-        conn.commit()
+    # Calculate component sums
+    usb_out_watts = (
+        get('pd.usb1Watts', 0) + get('pd.usb2Watts', 0)
+        + get('pd.qcUsb1Watts', 0) + get('pd.qcUsb2Watts', 0)
+    )
+    dc_out_watts = get('pd.carWatts', 0) + usb_out_watts
+    typec_out_watts = get('pd.typec1Watts', 0) + get('pd.typec2Watts', 0)
+
+    # Same statement every poll: prepare it server-side once
+    cur.execute(
+        INSERT_ECOFLOW_MEASUREMENT_SQL,
+        (device_sn, datetime.now(), *values, dc_out_watts, typec_out_watts, usb_out_watts),
+        prepare=True,
+    )
+    cur.connection.commit()
 
 
 class EcoFlowCollectorApp:
@@ -238,6 +211,7 @@ class EcoFlowCollectorApp:
         self.config = config
         self.device_sn = config["ecoflow_device_sn"]
         self.rest_api_interval = config["rest_api_interval"]
+        self.power_topic = f"paku/ecoflow/{self.device_sn}/power"
 
         self.api = EcoFlowAPI(
             access_key=config["ecoflow_access_key"],
@@ -246,6 +220,8 @@ class EcoFlowCollectorApp:
         )
 
         self.conn: Optional[psycopg.Connection] = None
+        # One cursor per connection, reused for every poll
+        self.cur: Optional[psycopg.Cursor] = None
         self.mqtt_client: Optional[mqtt.Client] = None
         self._init_db_connection()
         self._init_mqtt()
@@ -260,22 +236,39 @@ class EcoFlowCollectorApp:
                 dbname=self.config["pg_database"],
                 autocommit=False,
             )
+            self.cur = self.conn.cursor()
             logger.info("Database connection established")
         except Exception as e:
             logger.error("Failed to connect to database: %s", e)
             raise
 
     def _ensure_db_connection(self):
-        try:
-            if self.conn and not self.conn.closed:
-                with self.conn.cursor() as cur:
-                    cur.execute("SELECT 1")
-                return
-        except Exception:
+        # psycopg marks the connection broken when a query finds the
+        # server gone, so no SELECT 1 round trip is needed per poll
+        if self.conn and not self.conn.closed and not self.conn.broken:
+            return
+        if self.conn:
             logger.warning("Database connection lost, reconnecting...")
+            self.conn.close()
 
         self._init_db_connection()
 
+    def _store_measurement(self, data: Dict[str, Any]) -> None:
+        """Insert one poll's row, reconnecting and retrying once if the connection dropped."""
+        self._ensure_db_connection()
+        try:
+            insert_ecoflow_measurement(self.cur, self.device_sn, data)
+            return
+        except psycopg.Error:
+            if not self.conn.broken:
+                # Bad data, not a lost server: clear the failed transaction
+                # so the next poll can use the connection
+                self.conn.rollback()
+                raise
+
+        self._ensure_db_connection()
+        insert_ecoflow_measurement(self.cur, self.device_sn, data)
+
     def _init_mqtt(self):
         """Connect to the local MQTT broker for republishing power summaries.
 
@@ -328,7 +321,7 @@ class EcoFlowCollectorApp:
             + data.get("pd.typec1Watts", 0)
             + data.get("pd.typec2Watts", 0)
         )
-        payload = json.dumps({
+        payload = orjson.dumps({
             "soc":       data.get("bmsMaster.soc", 0),
             "solar_w":   data.get("mppt.inWatts", 0),
             "ac_in_w":   data.get("inv.inputWatts", 0),
@@ -337,8 +330,7 @@ class EcoFlowCollectorApp:
             "watts_in":  data.get("pd.wattsInSum", 0),
             "watts_out": data.get("pd.wattsOutSum", 0),
         })
-        topic = f"paku/ecoflow/{self.device_sn}/power"
-        self.mqtt_client.publish(topic, payload, qos=0, retain=True)
+        self.mqtt_client.publish(self.power_topic, payload, qos=0, retain=True)
 
     def fetch_and_store_data(self):
         try:
@@ -350,9 +342,7 @@ class EcoFlowCollectorApp:
                 logger.warning("No data received from API")
                 return
 
-            self._ensure_db_connection()
-
-            insert_ecoflow_measurement(self.conn, self.device_sn, quota_data)
+            self._store_measurement(quota_data)
             self._publish_power_mqtt(quota_data)
 
             # Log key metrics using summary fields
@@ -34,27 +34,27 @@ ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS pd_lcd_brightness INTE
 ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS pd_standby_mode INTEGER;
 
 -- Temperature sensors (previously only stored in raw_data JSONB)
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS inv_out_temp NUMERIC;
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_temp NUMERIC;
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_max_cell_temp NUMERIC;
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_min_cell_temp NUMERIC;
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS mppt_temp NUMERIC;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS inv_out_temp DOUBLE PRECISION;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_temp DOUBLE PRECISION;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_max_cell_temp DOUBLE PRECISION;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_min_cell_temp DOUBLE PRECISION;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS mppt_temp DOUBLE PRECISION;
 
 -- Power/energy fields (previously only stored in raw_data JSONB flat dot-keys)
 -- inv.inputWatts - AC input power (ac_out_watts already covers inv.outputWatts)
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS inv_input_watts NUMERIC;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS inv_input_watts DOUBLE PRECISION;
 -- inv voltage/current fields (keys: inv.acInVol, inv.invOutVol, inv.acInAmp, inv.invOutAmp)
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS inv_ac_in_vol NUMERIC;
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS inv_out_vol NUMERIC;
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS inv_ac_in_amp NUMERIC;
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS inv_out_amp NUMERIC;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS inv_ac_in_vol DOUBLE PRECISION;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS inv_out_vol DOUBLE PRECISION;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS inv_ac_in_amp DOUBLE PRECISION;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS inv_out_amp DOUBLE PRECISION;
 -- BMS fields (keys: bmsMaster.amp, bmsMaster.vol, etc.)
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_amp NUMERIC;
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_vol NUMERIC;
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_min_cell_vol NUMERIC;
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_max_cell_vol NUMERIC;
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_remain_cap NUMERIC;
-ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_full_cap NUMERIC;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_amp DOUBLE PRECISION;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_vol DOUBLE PRECISION;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_min_cell_vol DOUBLE PRECISION;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_max_cell_vol DOUBLE PRECISION;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_remain_cap DOUBLE PRECISION;
+ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_full_cap DOUBLE PRECISION;
 ALTER TABLE ecoflow_measurements ADD COLUMN IF NOT EXISTS bms_cycles INTEGER;
 
 -- WiFi signal strength
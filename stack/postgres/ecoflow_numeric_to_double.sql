@@ -0,0 +1,27 @@
+-- Migration: Store EcoFlow float readings as DOUBLE PRECISION instead of NUMERIC
+-- NUMERIC is variable-length arbitrary precision: every row carries a
+-- varlena per column and aggregates run in software decimal arithmetic.
+-- The readings are sensor floats (temperatures, volts, amps, watts) that
+-- need nowhere near that precision; float8 is a fixed 8 bytes and cheaper
+-- to write, store and aggregate in Grafana.
+--
+-- Rewrites the table once (ACCESS EXCLUSIVE lock for the duration).
+-- Run: psql -U paku -d paku -f ecoflow_numeric_to_double.sql
+
+ALTER TABLE ecoflow_measurements
+    ALTER COLUMN inv_out_temp TYPE DOUBLE PRECISION,
+    ALTER COLUMN bms_temp TYPE DOUBLE PRECISION,
+    ALTER COLUMN bms_max_cell_temp TYPE DOUBLE PRECISION,
+    ALTER COLUMN bms_min_cell_temp TYPE DOUBLE PRECISION,
+    ALTER COLUMN mppt_temp TYPE DOUBLE PRECISION,
+    ALTER COLUMN inv_input_watts TYPE DOUBLE PRECISION,
+    ALTER COLUMN inv_ac_in_vol TYPE DOUBLE PRECISION,
+    ALTER COLUMN inv_out_vol TYPE DOUBLE PRECISION,
+    ALTER COLUMN inv_ac_in_amp TYPE DOUBLE PRECISION,
+    ALTER COLUMN inv_out_amp TYPE DOUBLE PRECISION,
+    ALTER COLUMN bms_amp TYPE DOUBLE PRECISION,
+    ALTER COLUMN bms_vol TYPE DOUBLE PRECISION,
+    ALTER COLUMN bms_min_cell_vol TYPE DOUBLE PRECISION,
+    ALTER COLUMN bms_max_cell_vol TYPE DOUBLE PRECISION,
+    ALTER COLUMN bms_remain_cap TYPE DOUBLE PRECISION,
+    ALTER COLUMN bms_full_cap TYPE DOUBLE PRECISION;
@@ -0,0 +1,12 @@
+-- Migration: Replace the ecoflow_measurements ts btree with a BRIN index
+-- ecoflow_measurements is append-only in ts order; a BRIN index answers
+-- the dashboards' time-range scans while staying a few pages in size and
+-- costing next to nothing per insert. Per-device queries keep using
+-- idx_ecoflow_measurements_device_ts.
+--
+-- Run: psql -U paku -d paku -f ecoflow_ts_brin_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ecoflow_measurements_ts_brin
+    ON ecoflow_measurements USING BRIN (ts) WITH (pages_per_range = 32);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_ecoflow_measurements_ts;
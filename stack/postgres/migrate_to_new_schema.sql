@@ -54,6 +54,8 @@ CREATE TABLE IF NOT EXISTS ecoflow_measurements (
 );
 
 -- Create indexes for EcoFlow measurements if they don't exist
-CREATE INDEX IF NOT EXISTS idx_ecoflow_measurements_ts ON ecoflow_measurements(ts);
+CREATE INDEX IF NOT EXISTS idx_ecoflow_measurements_ts_brin ON ecoflow_measurements USING BRIN (ts) WITH (pages_per_range = 32);
+-- Replaced by the BRIN index above (see ecoflow_ts_brin_index.sql)
+DROP INDEX IF EXISTS idx_ecoflow_measurements_ts;
 CREATE INDEX IF NOT EXISTS idx_ecoflow_measurements_device_sn ON ecoflow_measurements(device_sn);
 CREATE INDEX IF NOT EXISTS idx_ecoflow_measurements_device_ts ON ecoflow_measurements(device_sn, ts DESC);
@@ -0,0 +1,45 @@
+-- Turn measurements into a TimescaleDB hypertable with native compression.
+-- Runs on first start after init.sql; safe to re-run by hand on an existing
+-- database:  docker exec -i paku_postgres psql -U paku paku < timescaledb.sql
+-- The server must preload the library (the image's CMD passes
+-- shared_preload_libraries=timescaledb), otherwise CREATE EXTENSION fails.
+--
+-- Chunks are one day of data (partitioned on ts). Chunks older than a day
+-- are compressed, segmented by (site_id, device_id) so per-device queries
+-- only decompress their own segments. Without the extension installed
+-- (plain postgres image) the script leaves measurements as a normal table.
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'timescaledb') THEN
+        RAISE NOTICE 'timescaledb is not available, measurements stays a plain table';
+        RETURN;
+    END IF;
+
+    CREATE EXTENSION IF NOT EXISTS timescaledb;
+
+    IF EXISTS (
+        SELECT 1 FROM timescaledb_information.hypertables
+        WHERE hypertable_schema = 'public' AND hypertable_name = 'measurements'
+    ) THEN
+        RETURN;
+    END IF;
+
+    -- Unique constraints on a hypertable must include the partitioning column
+    ALTER TABLE measurements DROP CONSTRAINT IF EXISTS measurements_pkey;
+    ALTER TABLE measurements ADD PRIMARY KEY (id, ts);
+
+    PERFORM create_hypertable(
+        'measurements', 'ts',
+        chunk_time_interval => INTERVAL '1 day',
+        migrate_data => true
+    );
+
+    ALTER TABLE measurements SET (
+        timescaledb.compress,
+        timescaledb.compress_segmentby = 'site_id, device_id',
+        timescaledb.compress_orderby = 'ts DESC'
+    );
+    PERFORM add_compression_policy('measurements', INTERVAL '1 day');
+END
+$$;